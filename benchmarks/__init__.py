@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks of report queries and renders on synthetic Chanjo databases.
+
+Run ``python -m benchmarks --help`` from the repository root.
+"""
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import logging
+import os
+
+import click
+
+from .generate import generate as generate_db
+from .run import compare as compare_runs, run_benchmarks, run_startup
+
+LOG = logging.getLogger(__name__)
+
+
+@click.group()
+@click.option('-v', '--verbose', is_flag=True)
+def benchmarks(verbose):
+    """Benchmark report queries and renders."""
+    logging.basicConfig(level=logging.INFO if verbose else logging.WARNING)
+
+
+@benchmarks.command()
+@click.option('-s', '--samples', default=100, show_default=True)
+@click.option('-g', '--genes', default=1000, show_default=True)
+@click.option('-t', '--transcripts', default=2, show_default=True,
+              help='transcripts per gene')
+@click.option('--groups', type=int, help='number of sample groups')
+@click.option('--seed', default=1, show_default=True)
+@click.argument('uri')
+def generate(samples, genes, transcripts, groups, seed, uri):
+    """Fill an empty database with synthetic coverage data.
+
+    For example 10k genes with 2 transcripts each and 5k samples:
+
+        python -m benchmarks generate -g 10000 -s 5000 sqlite:///bench.sqlite
+    """
+    counts = generate_db(uri, samples=samples, genes=genes,
+                         transcripts=transcripts, groups=groups, seed=seed)
+    click.echo("added {samples} samples and {transcripts} transcripts"
+               .format(**counts))
+
+
+@benchmarks.command()
+@click.option('-s', '--samples', default=10, show_default=True,
+              help='samples per report')
+@click.option('-p', '--panel-genes', default=100, show_default=True,
+              help='genes in the gene panel cases')
+@click.option('-r', '--repeat', default=5, show_default=True)
+@click.option('--pdf/--no-pdf', default=True, show_default=True,
+              help='also time PDF renders')
+@click.option('-o', '--only', multiple=True, help='only run these cases')
+@click.option('--startup/--no-startup', default=True, show_default=True,
+              help='also time interpreter and app startup')
+@click.option('-e', '--engine', type=click.Choice(['sql', 'numpy']),
+              default='sql', show_default=True, help='report aggregate engine')
+@click.option('--out', type=click.Path(), help='write results to a JSON file')
+@click.option('-b', '--baseline', type=click.File(),
+              help='compare to the results of an earlier run')
+@click.option('--threshold', default=0.2, show_default=True,
+              help='relative slowdown that counts as a regression')
+@click.argument('uri')
+@click.pass_context
+def run(context, samples, panel_genes, repeat, pdf, only, startup, engine, out,
+        baseline, threshold, uri):
+    """Time report queries and renders against a database."""
+    data = run_benchmarks(uri, samples=samples, panel_genes=panel_genes,
+                          repeat=repeat, with_pdf=pdf, only=only,
+                          engine=engine, with_startup=startup)
+    report_results(context, data, out, baseline, threshold)
+
+
+@benchmarks.command()
+@click.option('-r', '--repeat', default=5, show_default=True)
+@click.option('--pdf/--no-pdf', default=True, show_default=True,
+              help='also time importing WeasyPrint')
+@click.option('-o', '--only', multiple=True, help='only run these cases')
+@click.option('--out', type=click.Path(), help='write results to a JSON file')
+@click.option('-b', '--baseline', type=click.File(),
+              help='compare to the results of an earlier run')
+@click.option('--threshold', default=0.2, show_default=True,
+              help='relative slowdown that counts as a regression')
+@click.pass_context
+def startup(context, repeat, pdf, only, out, baseline, threshold):
+    """Time starting the CLI and creating the app in a fresh interpreter."""
+    data = run_startup(repeat=repeat, with_pdf=pdf, only=only)
+    report_results(context, data, out, baseline, threshold)
+
+
+def report_results(context, data, out, baseline, threshold):
+    """Save results and print them or compare them to a baseline."""
+    if out:
+        out_dir = os.path.dirname(out)
+        if out_dir and not os.path.exists(out_dir):
+            os.makedirs(out_dir)
+        with io.open(out, 'w', encoding='utf-8') as handle:
+            handle.write(json.dumps(data, indent=2, sort_keys=True))
+
+    if baseline:
+        context.invoke(compare, baseline=baseline, threshold=threshold,
+                       current_data=data)
+    else:
+        for name, timing in sorted(data['results'].items()):
+            click.echo("{:<28} {:>10.1f} ms".format(name, timing['median'] * 1000))
+
+
+@benchmarks.command()
+@click.option('--threshold', default=0.2, show_default=True,
+              help='relative slowdown that counts as a regression')
+@click.argument('baseline', type=click.File())
+@click.argument('current', type=click.File(), required=False)
+@click.pass_context
+def compare(context, threshold, baseline, current=None, current_data=None):
+    """Compare the results of two runs.
+
+    Exits with a non-zero status if any case got slower than the threshold.
+    """
+    baseline_data = json.load(baseline)
+    current_data = current_data or json.load(current)
+    rows = compare_runs(baseline_data, current_data, threshold=threshold)
+    click.echo("{:<28} {:>12} {:>12} {:>7}".format('case', 'baseline ms',
+                                                   'current ms', 'ratio'))
+    for name, base_median, median, ratio, regression in rows:
+        click.echo("{:<28} {:>12.1f} {:>12.1f} {:>6.2f}x{}".format(
+            name, base_median * 1000, median * 1000, ratio,
+            ' SLOWER' if regression else ''))
+    if any(row[-1] for row in rows):
+        context.exit(1)
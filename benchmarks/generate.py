@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Fill a Chanjo database with synthetic samples, genes and transcripts."""
+from __future__ import division
+from datetime import datetime, timedelta
+import logging
+import random
+
+from chanjo.store.api import ChanjoDB
+from chanjo.store.models import Sample, Transcript, TranscriptStat
+
+from chanjo_report.server.constants import LEVELS
+
+LOG = logging.getLogger(__name__)
+
+# share of genes placed on the sex chromosomes
+SEX_GENES = {'X': 0.04, 'Y': 0.005}
+
+
+def chromosome(gene_id, genes):
+    """Spread genes over the chromosomes, keeping a few on X and Y."""
+    share = gene_id / genes
+    if share <= SEX_GENES['Y']:
+        return 'Y'
+    if share <= SEX_GENES['Y'] + SEX_GENES['X']:
+        return 'X'
+    return str(gene_id % 22 + 1)
+
+
+def transcript_records(genes, transcripts):
+    """Generate transcript rows for a number of genes."""
+    for gene_id in range(1, genes + 1):
+        for index in range(transcripts):
+            yield dict(id="CCDS{}.{}".format(gene_id, index), gene_id=gene_id,
+                       gene_name="GENE{}".format(gene_id),
+                       chromosome=chromosome(gene_id, genes),
+                       length=random.randint(300, 9000))
+
+
+def stat_records(sample_id, transcripts, male):
+    """Generate transcript stats for one sample."""
+    for transcript in transcripts:
+        if transcript['chromosome'] == 'Y' and not male:
+            continue
+        mean_coverage = random.gauss(40, 15)
+        if transcript['chromosome'] in ('X', 'Y') and male:
+            mean_coverage /= 2
+        mean_coverage = max(mean_coverage, 0)
+        record = dict(sample_id=sample_id, transcript_id=transcript['id'],
+                      mean_coverage=mean_coverage, threshold=10)
+        completeness = 100.0
+        incomplete_exons = []
+        for level, field_id in LEVELS.items():
+            # higher levels are less likely to be completely covered
+            if random.random() < level / (mean_coverage + level):
+                completeness = min(completeness, random.uniform(50, 100))
+            record[field_id] = completeness
+        if record['completeness_10'] < 100:
+            start = random.randint(1, 10 ** 8)
+            incomplete_exons.append("{}|{}|{}|{:.1f}".format(
+                transcript['chromosome'], start, start + 150,
+                record['completeness_10']))
+        record['_incomplete_exons'] = ','.join(incomplete_exons) or None
+        yield record
+
+
+def insert_batches(connection, table, records, batch_size):
+    """Insert records in batches with ``executemany``."""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            connection.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        connection.execute(table.insert(), batch)
+
+
+def generate(uri, samples=100, genes=1000, transcripts=2, groups=None,
+             seed=1, batch_size=10000):
+    """Create a Chanjo database with synthetic coverage data.
+
+    Args:
+        uri (str): database URI, the database must be empty
+        samples (int): number of samples
+        genes (int): number of genes
+        transcripts (int): number of transcripts per gene
+        groups (Optional[int]): number of sample groups, defaults to one
+            group per 10 samples
+        seed (int): random seed, the same seed gives the same database
+        batch_size (int): rows per insert statement
+
+    Returns:
+        dict: number of samples, genes and transcripts
+    """
+    random.seed(seed)
+    groups = groups or max(samples // 10, 1)
+    store = ChanjoDB(uri)
+    store.set_up()
+
+    tx_records = list(transcript_records(genes, transcripts))
+    created_at = datetime(2017, 1, 1)
+    with store.engine.begin() as connection:
+        LOG.info("adding %s transcripts", len(tx_records))
+        insert_batches(connection, Transcript.__table__, tx_records,
+                       batch_size)
+
+    for index in range(samples):
+        sample_id = "sample{}".format(index)
+        group_id = "group{}".format(index % groups)
+        with store.engine.begin() as connection:
+            connection.execute(Sample.__table__.insert(), dict(
+                id=sample_id, group_id=group_id, name="Sample {}".format(index),
+                group_name="Group {}".format(index % groups),
+                created_at=created_at + timedelta(minutes=index)))
+            male = random.random() < 0.5
+            insert_batches(connection, TranscriptStat.__table__,
+                           stat_records(sample_id, tx_records, male),
+                           batch_size)
+        if (index + 1) % 100 == 0:
+            LOG.info("added %s samples", index + 1)
+
+    return dict(samples=samples, genes=genes,
+                transcripts=len(tx_records), groups=groups)
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Time report queries and page renders against a Chanjo database."""
+from __future__ import division
+from datetime import datetime
+import logging
+import platform
+import subprocess
+import timeit
+
+from chanjo.store.models import Sample, Transcript
+from flask import g
+
+from chanjo_report.server.app import create_app
+from chanjo_report.server.blueprints.report.utils import (
+    diagnostic_yield, keymetrics_rows, samplesex_rows, transcripts_rows)
+from chanjo_report.server.extensions import api
+from .startup import startup_cases
+
+LOG = logging.getLogger(__name__)
+
+
+class BenchmarkConfig(object):
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DEBUG = False
+    CHANJO_CACHE = None
+    CHANJO_TIMING = False
+
+
+def consume(rows):
+    """Exhaust row generators so that all queries run."""
+    return [row for row in rows]
+
+
+def fresh_request(func):
+    """Drop data kept on ``g`` so that every run queries the database."""
+    def run():
+        g.pop('chanjo_frames', None)
+        return func()
+    return run
+
+
+def timings(func, repeat):
+    """Run a function a number of times and summarize the timings."""
+    durations = []
+    for _ in range(repeat):
+        started = timeit.default_timer()
+        func()
+        durations.append(timeit.default_timer() - started)
+    durations.sort()
+    return dict(min=durations[0], median=durations[len(durations) // 2],
+                max=durations[-1], repeat=repeat)
+
+
+def git_commit():
+    """Return the current commit of the repository, if any."""
+    try:
+        output = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                         stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode('utf-8').strip()
+
+
+def make_cases(client, sample_ids, gene_ids, with_pdf=True):
+    """Set up the functions and pages to time."""
+    report_url = "/report?{}".format('&'.join("sample_id={}".format(sample_id)
+                                              for sample_id in sample_ids))
+    gene_url = "&gene_ids={}".format(','.join(map(str, gene_ids)))
+
+    def get(url):
+        def request_page():
+            response = client.get(url)
+            assert response.status_code == 200, response.status
+            return response.get_data()
+        return request_page
+
+    cases = [
+        ('keymetrics_rows', lambda: consume(keymetrics_rows(sample_ids))),
+        ('keymetrics_rows[panel]',
+         lambda: consume(keymetrics_rows(sample_ids, genes=gene_ids))),
+        ('transcripts_rows', lambda: consume(transcripts_rows(sample_ids))),
+        ('transcripts_rows[panel]',
+         lambda: consume(transcripts_rows(sample_ids, genes=gene_ids))),
+        ('samplesex_rows', lambda: consume(samplesex_rows(sample_ids))),
+        ('diagnostic_yield',
+         lambda: consume(diagnostic_yield(api, samples=sample_ids))),
+        ('diagnostic_yield[panel]',
+         lambda: consume(diagnostic_yield(api, samples=sample_ids,
+                                          genes=gene_ids))),
+        ('/report', get(report_url)),
+        ('/report[panel]', get(report_url + gene_url)),
+    ]
+    if with_pdf:
+        pdf_url = report_url.replace('/report', '/report/pdf', 1)
+        cases.append(('/report/pdf', get(pdf_url)))
+    return cases
+
+
+def run_benchmarks(uri, samples=10, panel_genes=100, repeat=5, with_pdf=True,
+                   only=None, engine='sql', with_startup=True):
+    """Time report queries and renders.
+
+    Args:
+        uri (str): database URI of a (synthetic) Chanjo database
+        samples (int): number of samples to include in each report
+        panel_genes (int): number of genes in the ``[panel]`` cases
+        repeat (int): number of runs per case
+        with_pdf (bool): also time PDF renders, requires WeasyPrint
+        only (Optional[List[str]]): names of cases to run
+        engine (Optional[str]): 'sql' or 'numpy', see ``CHANJO_ENGINE``
+        with_startup (Optional[bool]): also time interpreter and app startup
+
+    Returns:
+        dict: metadata about the run and timings per case
+    """
+    BenchmarkConfig.SQLALCHEMY_DATABASE_URI = uri
+    BenchmarkConfig.CHANJO_ENGINE = engine
+    app = create_app(config=BenchmarkConfig)
+    client = app.test_client()
+    with app.test_request_context():
+        sample_ids = [row[0] for row in
+                      api.query(Sample.id).order_by(Sample.id).limit(samples)]
+        gene_ids = [row[0] for row in
+                    api.query(Transcript.gene_id).distinct()
+                       .order_by(Transcript.gene_id).limit(panel_genes)]
+        database = dict(dialect=api.engine.dialect.name,
+                        samples=api.query(Sample).count(),
+                        transcripts=api.query(Transcript).count())
+
+        cases = [(name, fresh_request(func)) for name, func
+                 in make_cases(client, sample_ids, gene_ids, with_pdf=with_pdf)]
+        if with_startup:
+            cases.extend(startup_cases(with_pdf=with_pdf))
+        results = run_cases(cases, repeat, only=only, teardown=api.session.remove)
+
+    meta = dict(commit=git_commit(), created_at=datetime.now().isoformat(),
+                python=platform.python_version(), database=database,
+                engine=engine,
+                report_samples=len(sample_ids), panel_genes=len(gene_ids))
+    return dict(meta=meta, results=results)
+
+
+def run_cases(cases, repeat, only=None, teardown=None):
+    """Time cases, skipping those not in ``only``.
+
+    Args:
+        cases (List[tuple]): name and function to time
+        repeat (int): number of runs per case
+        only (Optional[List[str]]): names of cases to run
+        teardown (Optional[callable]): called after each case
+    """
+    results = {}
+    for name, func in cases:
+        if only and name not in only:
+            continue
+        LOG.info("running: %s", name)
+        # warm up connections and caches of parsed templates
+        func()
+        results[name] = timings(func, repeat)
+        if teardown is not None:
+            teardown()
+    return results
+
+
+def run_startup(repeat=5, with_pdf=True, only=None):
+    """Time interpreter and app startup only, no database is needed."""
+    results = run_cases(startup_cases(with_pdf=with_pdf), repeat, only=only)
+    meta = dict(commit=git_commit(), created_at=datetime.now().isoformat(),
+                python=platform.python_version())
+    return dict(meta=meta, results=results)
+
+
+def compare(baseline, current, threshold=0.2):
+    """Compare median timings of two benchmark runs.
+
+    Args:
+        baseline (dict): results of an earlier run
+        current (dict): results of this run
+        threshold (float): relative slowdown that counts as a regression
+
+    Returns:
+        List[tuple]: name, baseline and current median, ratio, regression
+    """
+    rows = []
+    for name, timing in sorted(current['results'].items()):
+        base_timing = baseline['results'].get(name)
+        if base_timing is None:
+            continue
+        ratio = timing['median'] / base_timing['median']
+        rows.append((name, base_timing['median'], timing['median'], ratio,
+                     ratio > 1 + threshold))
+    return rows
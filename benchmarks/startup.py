@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Time how long it takes to start the CLI and to create the report app.
+
+Every case runs in a fresh interpreter so that nothing is imported yet.
+"""
+import subprocess
+import sys
+
+# name, Python code to run
+STARTUP_CASES = [
+    ('startup[python]', 'pass'),
+    ('startup[version]', 'import chanjo_report; chanjo_report.__version__'),
+    ('startup[cli]', 'import chanjo_report.cli'),
+    ('startup[app]', 'from chanjo_report.server.app import create_app; create_app()'),
+    # deferred until the first PDF is rendered
+    ('startup[weasyprint]', 'import weasyprint'),
+]
+
+
+def run_python(code, python=sys.executable):
+    """Return a function running code in a new interpreter."""
+    def start():
+        process = subprocess.Popen([python, '-c', code], stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT)
+        output = process.communicate()[0]
+        if process.returncode != 0:
+            raise RuntimeError("{!r} failed: {}".format(code, output.decode('utf-8')))
+    return start
+
+
+def startup_cases(with_pdf=True):
+    """Set up the interpreter starts to time."""
+    return [(name, run_python(code)) for name, code in STARTUP_CASES
+            if with_pdf or name != 'startup[weasyprint]']
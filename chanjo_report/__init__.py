@@ -8,8 +8,6 @@ Chanjo Report automatically renders a coverage report from Chanjo ouput.
 :copyright: (c) 2014 by Robin Andeer
 :licence: MIT, see LICENCE for more details
 """
-from pkg_resources import get_distribution
-
 # generate your own AsciiArt at:
 # patorjk.com/software/taag/#f=Calvin%20S&t=Chanjo Report
 __banner__ = r"""
@@ -22,7 +20,18 @@ __title__ = 'chanjo-report'
 __summary__ = 'Automatically renders coverage reports from Chanjo ouput.'
 __uri__ = 'https://github.com/robinandeer/chanjo-report'
 
-__version__ = get_distribution(__title__).version
+
+def _installed_version(name):
+    """Look up the installed version, avoiding the slow pkg_resources import."""
+    try:
+        from importlib.metadata import version
+    except ImportError:  # pragma: no cover, Python < 3.8
+        from pkg_resources import get_distribution
+        return get_distribution(name).version
+    return version(name)
+
+
+__version__ = _installed_version(__title__)
 
 __author__ = 'Robin Andeer'
 __email__ = 'robin.andeer@gmail.com'
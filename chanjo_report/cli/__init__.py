@@ -1,2 +1,10 @@
 # -*- coding: utf-8 -*-
 from .core import report
+
+# imported when invoked, see LazyGroup
+report.add_lazy_command('batch-pdf', 'chanjo_report.cli.batch:batch_pdf')
+report.add_lazy_command('compress-static', 'chanjo_report.cli.static:compress_static')
+report.add_lazy_command('db', 'chanjo_report.cli.db:db')
+report.add_lazy_command('export', 'chanjo_report.cli.export:export')
+report.add_lazy_command('panel', 'chanjo_report.cli.panel:panel')
+report.add_lazy_command('summarize', 'chanjo_report.cli.summary:summarize')
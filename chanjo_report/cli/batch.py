@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import os
+
+import click
+
+from chanjo_report.interfaces.pdf import render_batch
+from chanjo_report.interfaces.utils import configure_app, group_samples
+
+
+@click.command('batch-pdf')
+@click.option('-g', '--group', 'groups', multiple=True,
+              help='group to render a report for')
+@click.option('-s', '--samples', 'sample_sets', multiple=True,
+              help='comma separated samples to render one report for')
+@click.option('-f', '--groups-file', type=click.File(),
+              help='file with one group per line')
+@click.option('-o', '--out-dir', type=click.Path(file_okay=False), default='.',
+              help='folder to write reports to')
+@click.option('--level', type=int, default=10, help='completeness cutoff')
+@click.option('--gene-ids', help='comma separated genes to restrict reports to')
+@click.option('--show-genes', is_flag=True,
+              help='list incompletely covered genes')
+@click.option('-j', '--processes', type=int,
+              help='number of worker processes [default: number of CPUs]')
+@click.pass_context
+def batch_pdf(context, groups, sample_sets, groups_file, out_dir, level,
+              gene_ids, show_genes, processes):
+    """Render PDF reports for many groups/sample sets in parallel."""
+    groups = list(groups)
+    if groups_file:
+        groups.extend(line.strip() for line in groups_file if line.strip())
+    if not (groups or sample_sets):
+        click.echo('provide groups or sample sets to render reports for')
+        context.abort()
+
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+
+    params = dict(level=level)
+    if gene_ids:
+        params['gene_ids'] = gene_ids
+    if show_genes:
+        params['show_genes'] = 'on'
+    panel_name = context.obj['report'].get('panel_name')
+    if panel_name:
+        params['panel_name'] = panel_name
+
+    jobs = []
+    app = configure_app(context.obj)
+    for group_id in groups:
+        sample_ids = group_samples(app, group_id)
+        if not sample_ids:
+            click.echo("no samples found for group: {}".format(group_id))
+            continue
+        target = os.path.join(out_dir, "{}.pdf".format(group_id))
+        jobs.append((group_id, sample_ids, params, target))
+    for raw_samples in sample_sets:
+        sample_ids = [sample_id.strip() for sample_id in raw_samples.split(',')]
+        name = '_'.join(sample_ids)
+        target = os.path.join(out_dir, "{}.pdf".format(name))
+        jobs.append((name, sample_ids, params, target))
+
+    failed = []
+    for name, target, error in render_batch(context.obj, jobs, processes=processes):
+        if error:
+            failed.append(name)
+            click.echo("{}: failed, {}".format(name, error), err=True)
+        else:
+            click.echo("{}: {}".format(name, target))
+    if failed:
+        click.echo("{} of {} reports failed".format(len(failed), len(jobs)), err=True)
+        context.exit(1)
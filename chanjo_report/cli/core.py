@@ -1,15 +1,34 @@
 # -*- coding: utf-8 -*-
 import click
 
-from chanjo_report.interfaces import html, pdf
+from .utils import LazyGroup
 
 
-@click.command()
+@click.group(cls=LazyGroup, invoke_without_command=True)
 @click.option('-r', '--render', type=click.Choice(['html', 'pdf']), default='html')
 @click.option('-l', '--language', type=click.Choice(['en', 'sv']))
+@click.option('-g', '--group', help='group of samples to render a PDF for')
+@click.option('-s', '--sample', 'samples', multiple=True,
+              help='sample to include in the PDF')
+@click.option('-p', '--panel-name', help='gene panel name to display')
 @click.option('-d', '--debug', is_flag=True)
+@click.option('--host', help='interface to serve HTML reports on')
+@click.option('--port', type=int, help='port to serve HTML reports on')
+@click.option('--server', type=click.Choice(['dev', 'gunicorn']), default='dev',
+              help='WSGI server for HTML reports')
+@click.option('-w', '--workers', type=int, help='Gunicorn worker processes')
+@click.option('--threads', type=int, help='threads per Gunicorn worker')
+@click.option('--pool-size', type=int, help='database connections to keep open')
+@click.option('--max-overflow', type=int,
+              help='extra database connections allowed under load')
+@click.option('--pool-recycle', type=int,
+              help='seconds after which database connections are replaced')
+@click.option('--pool-pre-ping/--no-pool-pre-ping', default=None,
+              help='test database connections before using them')
 @click.pass_context
-def report(context, render, language, debug):
+def report(context, render, language, group, samples, panel_name, debug, host,
+           port, server, workers, threads, pool_size, max_overflow,
+           pool_recycle, pool_pre_ping):
     """Generate a coverage report from Chanjo SQL output."""
     # get uri + dialect of Chanjo database
     if context.obj['database'] is None:
@@ -17,9 +36,24 @@ def report(context, render, language, debug):
         context.abort()
 
     # set the custom option
-    context.obj['report'] = dict(language=language, debug=debug)
+    context.obj['report'] = dict(language=language, debug=debug, group=group,
+                                 samples=samples, panel_name=panel_name,
+                                 host=host, port=port, server=server,
+                                 workers=workers, threads=threads,
+                                 pool_size=pool_size, max_overflow=max_overflow,
+                                 pool_recycle=pool_recycle,
+                                 pool_pre_ping=pool_pre_ping)
 
+    if context.invoked_subcommand:
+        return
+
+    # the report app is only needed when rendering reports right here
+    from chanjo_report.interfaces import html, pdf
     if render == 'html':
         html.render_html(context.obj)
     else:
-        pdf.render_pdf(context.obj)
+        if not (group or samples):
+            click.echo('provide a group or samples to render a PDF for')
+            context.abort()
+        pdf_data = pdf.render_pdf(context.obj)
+        click.get_binary_stream('stdout').write(pdf_data)
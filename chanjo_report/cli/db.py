@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+import timeit
+
+from chanjo.store.models import Sample, Transcript
+import click
+from sqlalchemy import event
+
+from chanjo_report.interfaces.utils import configure_app
+from chanjo_report.server.constants import LEVELS
+from chanjo_report.server.extensions import api
+from chanjo_report.server.indexes import create_indexes, explain, missing_indexes
+
+
+def report_urls(sample_ids, gene_id):
+    """Pages whose queries are profiled."""
+    samples_query = '&'.join("sample_id={}".format(sample_id)
+                             for sample_id in sample_ids)
+    return [
+        "/report?show_genes=yes&{}".format(samples_query),
+        "/genes?{}".format(samples_query),
+        "/genes/{}?{}".format(gene_id, samples_query),
+    ]
+
+
+def profile_pages(app, urls, repeat=3):
+    """Time pages and capture the SELECT statements they execute.
+
+    Returns:
+        tuple: median seconds per URL, (statement, parameters) in order
+    """
+    statements = {}
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.setdefault(statement, parameters)
+
+    client = app.test_client()
+    with app.app_context():
+        engine = api.engine
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        timings = {}
+        for url in urls:
+            # warm up connections and caches of parsed templates
+            response = client.get(url)
+            if response.status_code != 200:
+                raise click.ClickException("{} failed: {}".format(url, response.status))
+            durations = []
+            for _ in range(repeat):
+                started = timeit.default_timer()
+                client.get(url)
+                durations.append(timeit.default_timer() - started)
+            timings[url] = sorted(durations)[len(durations) // 2]
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+    return timings, list(statements.items())
+
+
+def echo_plans(engine, statements):
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            click.echo(click.style(' '.join(statement.split())[:200], fg='blue'))
+            for line in explain(connection, statement, parameters):
+                click.echo("  {}".format(line))
+
+
+@click.group()
+def db():
+    """Manage the Chanjo database for reports."""
+    pass
+
+
+@db.command()
+@click.option('-s', '--sample', 'sample_ids', multiple=True,
+              help='samples to profile reports with, defaults to the first 5')
+@click.option('-l', '--level', 'levels', multiple=True, default=['10'],
+              type=click.Choice([str(level) for level in LEVELS]),
+              help='completeness levels to index')
+@click.option('-n', '--dry-run', is_flag=True, help="don't create any indexes")
+@click.option('-r', '--repeat', default=3, help='times to render each page')
+@click.option('-p', '--plans', is_flag=True, help='print query plans')
+@click.pass_context
+def optimize(context, sample_ids, levels, dry_run, repeat, plans):
+    """Create missing indexes for the report queries.
+
+    Renders a few report pages, before and after creating indexes, and
+    prints their timings and, with --plans, the query plans of the
+    statements they execute.
+    """
+    app = configure_app(context.obj)
+    with app.app_context():
+        engine = api.engine
+        sample_ids = list(sample_ids) or [row[0] for row in api.query(Sample.id)
+                                                               .order_by(Sample.id)
+                                                               .limit(5)]
+        gene_id = api.query(Transcript.gene_id).limit(1).scalar()
+    if not sample_ids or gene_id is None:
+        click.echo('no samples or transcripts in the database')
+        context.abort()
+
+    missing = missing_indexes(engine, levels=[int(level) for level in levels])
+    if not missing:
+        click.echo('all report indexes are in place')
+    for name, table, columns in missing:
+        click.echo("missing index: {} on {} ({})".format(name, table,
+                                                         ', '.join(columns)))
+    if dry_run or not missing:
+        if plans:
+            _, statements = profile_pages(app, report_urls(sample_ids, gene_id),
+                                          repeat=1)
+            echo_plans(engine, statements)
+        return
+
+    urls = report_urls(sample_ids, gene_id)
+    before, statements = profile_pages(app, urls, repeat=repeat)
+    if plans:
+        click.echo(click.style('plans before:', bold=True))
+        echo_plans(engine, statements)
+
+    create_indexes(engine, missing)
+    click.echo("created {} indexes".format(len(missing)))
+
+    after, statements = profile_pages(app, urls, repeat=repeat)
+    if plans:
+        click.echo(click.style('plans after:', bold=True))
+        echo_plans(engine, statements)
+
+    click.echo("{:<60} {:>10} {:>10}".format('page', 'before ms', 'after ms'))
+    for url in urls:
+        click.echo("{:<60} {:>10.1f} {:>10.1f}".format(url[:60], before[url] * 1000,
+                                                       after[url] * 1000))
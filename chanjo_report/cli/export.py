@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import json
+
+import click
+
+from chanjo_report.interfaces.utils import configure_app, group_samples
+from chanjo_report.server.blueprints.api.utils import (iter_csv, report_data,
+                                                       section_records, SECTIONS)
+from chanjo_report.server.constants import LEVELS
+from chanjo_report.server.extensions import api
+from chanjo_report.server.panels import panel_genes
+
+
+@click.command()
+@click.option('-s', '--sample', 'sample_ids', multiple=True,
+              help='sample to export metrics for')
+@click.option('-g', '--group', 'groups', multiple=True,
+              help='group of samples to export metrics for')
+@click.option('--gene-ids', help='comma separated genes to restrict metrics to')
+@click.option('-p', '--panel-id', help='stored gene panel to restrict metrics to')
+@click.option('--level', type=click.Choice([str(level) for level in LEVELS]),
+              default='10', help='completeness cutoff')
+@click.option('-f', '--format', 'data_format', type=click.Choice(['json', 'csv']),
+              default='json')
+@click.option('--section', type=click.Choice(SECTIONS), default='metrics',
+              help='section to export as CSV')
+@click.pass_context
+def export(context, sample_ids, groups, gene_ids, panel_id, level, data_format,
+           section):
+    """Export report metrics as JSON or CSV."""
+    app = configure_app(context.obj)
+    sample_ids = list(sample_ids)
+    for group_id in groups:
+        sample_ids.extend(group_samples(app, group_id))
+    if not sample_ids:
+        click.echo('provide samples or groups to export metrics for')
+        context.abort()
+
+    level = int(level)
+    gene_ids = [int(gene_id) for gene_id in gene_ids.split(',')] if gene_ids else []
+    with app.test_request_context():
+        if panel_id:
+            gene_ids = panel_genes(api, panel_id)
+            if gene_ids is None:
+                click.echo("gene panel not found: {}".format(panel_id))
+                context.abort()
+        if data_format == 'csv':
+            records = section_records(section, sample_ids, gene_ids=gene_ids,
+                                      level=level)
+            for line in iter_csv(section, records):
+                click.echo(line, nl=False)
+        else:
+            data = report_data(sample_ids, gene_ids=gene_ids, level=level)
+            data['level'] = level
+            click.echo(json.dumps(data, indent=2))
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import click
+from chanjo.store.api import ChanjoDB
+
+from chanjo_report.server.panels import delete_panel, list_panels, save_panel
+
+
+@click.group()
+def panel():
+    """Manage stored gene panels."""
+    pass
+
+
+@panel.command()
+@click.option('-n', '--name', help='name to display in reports')
+@click.argument('panel_id')
+@click.argument('gene_file', type=click.File())
+@click.pass_context
+def add(context, name, panel_id, gene_file):
+    """Store a panel from a file of gene ids, one per line (or comma separated).
+
+    A panel with the same id is replaced.
+    """
+    gene_ids = [gene_id.strip() for line in gene_file
+                for gene_id in line.split(',') if gene_id.strip()]
+    if not gene_ids:
+        click.echo('no genes found')
+        context.abort()
+    try:
+        gene_ids = [int(gene_id) for gene_id in gene_ids]
+    except ValueError as error:
+        click.echo("gene ids must be integers: {}".format(error))
+        context.abort()
+    chanjo_db = ChanjoDB(context.obj['database'])
+    stored = save_panel(chanjo_db, panel_id, gene_ids, name=name)
+    click.echo("stored panel {} with {} genes".format(panel_id, stored['genes']))
+
+
+@panel.command('list')
+@click.pass_context
+def list_cmd(context):
+    """List stored panels."""
+    chanjo_db = ChanjoDB(context.obj['database'])
+    for panel_obj in list_panels(chanjo_db):
+        click.echo("{}\t{}\t{}\t{}".format(panel_obj.id, panel_obj.name,
+                                           panel_obj.genes, panel_obj.updated_at))
+
+
+@panel.command()
+@click.argument('panel_id')
+@click.pass_context
+def delete(context, panel_id):
+    """Remove a stored panel."""
+    chanjo_db = ChanjoDB(context.obj['database'])
+    delete_panel(chanjo_db, panel_id)
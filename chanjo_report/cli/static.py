@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import os
+
+import click
+from werkzeug.utils import import_string
+
+from chanjo_report.server.config import DefaultConfig
+from chanjo_report.server.responses import load_brotli, precompress
+
+
+def static_folders(blueprints):
+    """List the static folders of the report blueprints."""
+    folders = []
+    for blueprint in blueprints:
+        if isinstance(blueprint, str):
+            blueprint = import_string(blueprint)
+        if blueprint.static_folder and os.path.isdir(blueprint.static_folder):
+            folders.append(blueprint.static_folder)
+    return folders
+
+
+@click.command('compress-static')
+@click.argument('folders', nargs=-1, type=click.Path(exists=True, file_okay=False))
+def compress_static(folders):
+    """Write gzip (and Brotli) compressed copies of static files.
+
+    The report server sends them in place of the originals to clients
+    that accept the encoding. Defaults to the static folders of the
+    report blueprints; run again after upgrading.
+    """
+    if not load_brotli():
+        click.echo('brotli not installed, only writing gzip files')
+    for folder in folders or static_folders(DefaultConfig.BLUEPRINTS):
+        for path in precompress(folder):
+            click.echo("wrote {}".format(path))
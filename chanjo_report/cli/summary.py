@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+import click
+from chanjo.store.api import ChanjoDB
+
+from chanjo_report.server.sex import refresh_sex
+from chanjo_report.server.summary import refresh
+
+
+@click.command()
+@click.option('-s', '--sample', 'sample_ids', multiple=True,
+              help='only summarize these samples')
+@click.option('-f', '--force', is_flag=True,
+              help='summarize samples even if they are up to date')
+@click.option('--sex-only', is_flag=True,
+              help='only backfill sex predictions, skip the gene summary')
+@click.pass_context
+def summarize(context, sample_ids, force, sex_only):
+    """Refresh the per-sample gene coverage summary and sex predictions."""
+    chanjo_db = ChanjoDB(context.obj['database'])
+    if not sex_only:
+        refreshed = refresh(chanjo_db, sample_ids=sample_ids, force=force)
+        click.echo("summarized {} samples".format(len(refreshed)))
+    predicted = refresh_sex(chanjo_db, sample_ids=sample_ids, force=force)
+    click.echo("predicted sex for {} samples".format(len(predicted)))
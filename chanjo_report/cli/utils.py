@@ -1,6 +1,39 @@
 # -*- coding: utf-8 -*-
 """Utilities related to entry point interfaces loaded by the CLI."""
-from pkg_resources import iter_entry_points
+import importlib
+
+import click
+
+
+class LazyGroup(click.Group):
+
+    """Command group that imports subcommands only when they are used.
+
+    Subcommands pull in the report app and the database layer; running
+    one of them, or the group itself, shouldn't import all the others.
+
+    Args:
+        lazy_commands (Optional[dict]): command name -> ``module:attribute``
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.lazy_commands = kwargs.pop('lazy_commands', None) or {}
+        super(LazyGroup, self).__init__(*args, **kwargs)
+
+    def add_lazy_command(self, name, import_path):
+        """Register a subcommand by import path."""
+        self.lazy_commands[name] = import_path
+
+    def list_commands(self, ctx):
+        commands = super(LazyGroup, self).list_commands(ctx)
+        return sorted(set(commands) | set(self.lazy_commands))
+
+    def get_command(self, ctx, name):
+        if name not in self.commands and name in self.lazy_commands:
+            module_name, attribute = self.lazy_commands[name].split(':')
+            command = getattr(importlib.import_module(module_name), attribute)
+            self.add_command(command, name)
+        return super(LazyGroup, self).get_command(ctx, name)
 
 
 def iter_interfaces(ep_key='chanjo_report.interfaces'):
@@ -12,6 +45,7 @@ def iter_interfaces(ep_key='chanjo_report.interfaces'):
     Yields:
         object: Entry point object
     """
+    from pkg_resources import iter_entry_points
     for entry_point in iter_entry_points(ep_key):
         yield entry_point
 
@@ -1,23 +1,57 @@
 # -*- coding: utf-8 -*-
+import multiprocessing
+
 import click
 
 from chanjo_report.server.app import create_app
-from chanjo_report.server.config import ProdConfig
+from .utils import app_config
+
+
+def run_gunicorn(app, host, port, workers=None, threads=1):
+    """Serve the app with Gunicorn, a pre-fork WSGI server.
+
+    Args:
+        app (Flask): report app
+        host (str): interface to bind to
+        port (int): port to listen on
+        workers (Optional[int]): worker processes, defaults to 2 * CPUs + 1
+        threads (Optional[int]): threads per worker process
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise click.ClickException("install Gunicorn to use it as server: "
+                                   "pip install chanjo-report[server]")
+
+    class ReportApplication(BaseApplication):
+
+        def load_config(self):
+            self.cfg.set('bind', "{}:{}".format(host, port))
+            self.cfg.set('workers', workers or multiprocessing.cpu_count() * 2 + 1)
+            self.cfg.set('threads', threads)
+
+        def load(self):
+            return app
+
+    ReportApplication().run()
 
 
 def render_html(options):
-    """Start a Flask server to generate HTML report on request."""
-    # spin up the Flask server
-    config = ProdConfig
-    config.SQLALCHEMY_DATABASE_URI = options['database']
+    """Start a server to generate HTML reports on request.
+
+    The default development server handles requests in threads; use
+    ``server='gunicorn'`` to serve many clients from several processes.
+    """
+    config = app_config(options)
     report_options = options['report']
-    config.CHANJO_PANEL_NAME = report_options.get('panel_name')
-    config.CHANJO_LANGUAGE = report_options.get('language')
-    config.CHANJO_PANEL = report_options.get('panel')
     config.DEBUG = report_options.get('debug')
 
     app = create_app(config=config)
-    host = report_options.get('host', '0.0.0.0')
-    port = report_options.get('port', 5000)
+    host = report_options.get('host') or '0.0.0.0'
+    port = report_options.get('port') or 5000
     click.echo(click.style("open browser to: http://{}:{}".format(host, port), fg='blue'))
-    app.run(host=host, port=port)
+    if report_options.get('server') == 'gunicorn':
+        run_gunicorn(app, host, port, workers=report_options.get('workers'),
+                     threads=report_options.get('threads') or 1)
+    else:
+        app.run(host=host, port=port, threaded=True)
@@ -1,26 +1,75 @@
 # -*- coding: utf-8 -*-
-from flask import url_for
-from flask_weasyprint import HTML
+import logging
+from multiprocessing import Pool
 
-from chanjo_report.server.app import create_app
-from chanjo_report.server.config import DefaultConfig
+from chanjo_report.server.pdf import write_report
+from .utils import configure_app, group_samples
+
+LOG = logging.getLogger(__name__)
+
+# report app of the current worker process, see ``init_worker``
+worker_app = None
+
+
+def init_worker(options):
+    """Set up a report app for each worker process."""
+    global worker_app
+    worker_app = configure_app(options)
+
+
+def render_job(job):
+    """Render one report in a worker process.
+
+    Errors are returned rather than raised so that one failing report
+    doesn't stop the rest of the batch.
+
+    Returns:
+        tuple: name, target path and error message (None on success)
+    """
+    name, sample_ids, params, target = job
+    try:
+        write_report(worker_app, sample_ids, target=target, **params)
+    except Exception as error:
+        LOG.exception("unable to render report: %s", name)
+        return name, target, "{}: {}".format(type(error).__name__, error)
+    return name, target, None
+
+
+def render_batch(options, jobs, processes=None):
+    """Render many PDF reports spread over a pool of processes.
+
+    Args:
+        options (dict): Chanjo CLI context, see ``configure_app``
+        jobs (List[tuple]): (name, sample ids, report params, target path)
+        processes (Optional[int]): worker processes, defaults to CPU count
+
+    Yields:
+        tuple: name, target path and error message (None on success) of
+            each finished report
+    """
+    pool = Pool(processes=processes, initializer=init_worker,
+                initargs=(options,))
+    try:
+        for result in pool.imap_unordered(render_job, jobs):
+            yield result
+        pool.close()
+    except BaseException:
+        # also on KeyboardInterrupt and when the generator is closed early
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
 
 
 def render_pdf(options):
     """Generate a PDF report for a given group of samples."""
-    group_id = options['report']['group']
-    url = "/groups/{}".format(group_id)
-
-    # spin up the Flask server
-    config = DefaultConfig
     report_options = options['report']
-    config.CHANJO_URI = options.get('database')
-    panel_name = report_options.get('panel_name')
-    config.CHANJO_LANGUAGE = report_options.get('language')
-    config.CHANJO_PANEL = report_options.get('panel')
-
-    app = create_app(config=config)
-    with app.test_request_context(base_url='http://localhost/'):
-        url = url_for('report.group', group_id=group_id, panel_name=panel_name)
-        # /hello/ is resolved relative to the context’s URL.
-        return HTML(url).write_pdf()
+    app = configure_app(options)
+    sample_ids = list(report_options.get('samples') or [])
+    if report_options.get('group'):
+        sample_ids.extend(group_samples(app, report_options['group']))
+
+    params = {}
+    if report_options.get('panel_name'):
+        params['panel_name'] = report_options['panel_name']
+    return write_report(app, sample_ids, **params)
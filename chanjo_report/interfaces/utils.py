@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Helpers for interfaces using the report app outside of a web server."""
+from chanjo.store.models import Sample
+
+from chanjo_report.server.app import create_app
+from chanjo_report.server.config import ProdConfig
+from chanjo_report.server.extensions import api
+
+# CLI options for the database connection pool and their config keys
+POOL_OPTIONS = {
+    'pool_size': 'SQLALCHEMY_POOL_SIZE',
+    'max_overflow': 'SQLALCHEMY_MAX_OVERFLOW',
+    'pool_recycle': 'SQLALCHEMY_POOL_RECYCLE',
+    'pool_pre_ping': 'SQLALCHEMY_POOL_PRE_PING',
+}
+
+
+def app_config(options):
+    """Set up the production config from the Chanjo CLI context."""
+    config = ProdConfig
+    config.SQLALCHEMY_DATABASE_URI = options['database']
+    report_options = options.get('report') or {}
+    config.CHANJO_PANEL_NAME = report_options.get('panel_name')
+    config.CHANJO_LANGUAGE = report_options.get('language')
+    config.CHANJO_PANEL = report_options.get('panel')
+    for option, config_key in POOL_OPTIONS.items():
+        if report_options.get(option) is not None:
+            setattr(config, config_key, report_options[option])
+    if report_options.get('threads'):
+        # sizes the report sections pool, see server/sections.py
+        config.CHANJO_SERVER_THREADS = report_options['threads']
+    return config
+
+
+def configure_app(options):
+    """Create a report app for rendering reports without a server."""
+    config = app_config(options)
+    # every report is rendered once, don't spend memory caching them
+    config.CHANJO_CACHE = None
+    return create_app(config=config)
+
+
+def group_samples(app, group_id):
+    """Return ids of all samples in a group."""
+    with app.app_context():
+        query = api.query(Sample.id).filter(Sample.group_id == group_id)
+        return [row[0] for row in query]
@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
 from flask import current_app, Flask, request
 from flask_babel import Babel
+from werkzeug.utils import import_string
 
+from . import columnar
 from .config import DefaultConfig
-from .extensions import api
+from .extensions import (api, cache, compression, jobs, metrics, replica,
+                         sections, stores)
 from .utils import pretty_date
 from .constants import LEVELS
 
@@ -26,10 +29,24 @@ def configure_app(app, config=None, config_file=None):
     if config:
         app.config.from_object(config)
 
+    engine = app.config.get('CHANJO_ENGINE', 'sql')
+    if engine not in columnar.ENGINES:
+        raise ValueError("unknown CHANJO_ENGINE: {}".format(engine))
+    if engine == 'numpy' and not columnar.load_numpy():
+        raise RuntimeError("CHANJO_ENGINE 'numpy' requires NumPy, install "
+                           "chanjo-report[numpy]")
+
 
 def configure_extensions(app):
     """Initialize Flask extensions."""
     api.init_app(app)
+    cache.init_app(app)
+    compression.init_app(app)
+    jobs.init_app(app)
+    metrics.init_app(app)
+    replica.init_app(app)
+    sections.init_app(app)
+    stores.init_app(app)
 
     # Flask-babel
     babel = Babel(app)
@@ -58,6 +75,8 @@ def configure_extensions(app):
 def configure_blueprints(app):
     """Configure blueprints in views."""
     for blueprint in app.config.get('BLUEPRINTS', []):
+        if isinstance(blueprint, str):
+            blueprint = import_string(blueprint)
         app.register_blueprint(blueprint)
 
 
@@ -1,3 +1,30 @@
 # -*- coding: utf-8 -*-
-from .index import index_bp
-from .report import report_bp
+"""Report blueprints.
+
+Each blueprint is imported on first access so that an app only loads the
+views it registers, see ``BLUEPRINTS`` in the config.
+"""
+import importlib
+import sys
+
+BLUEPRINT_MODULES = {
+    'api_bp': 'chanjo_report.server.blueprints.api',
+    'index_bp': 'chanjo_report.server.blueprints.index',
+    'jobs_bp': 'chanjo_report.server.blueprints.jobs',
+    'report_bp': 'chanjo_report.server.blueprints.report',
+}
+
+
+def __getattr__(name):
+    module_name = BLUEPRINT_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError("module {!r} has no attribute {!r}"
+                             .format(__name__, name))
+    return getattr(importlib.import_module(module_name), name)
+
+
+if sys.version_info < (3, 7):  # pragma: no cover, no module __getattr__
+    from .api import api_bp
+    from .index import index_bp
+    from .jobs import jobs_bp
+    from .report import report_bp
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""Serialize report metrics to plain records for JSON/CSV export."""
+import csv
+import io
+import math
+
+from chanjo.store.models import Transcript
+from sqlalchemy import func
+
+from chanjo_report.server.blueprints.report.utils import (
+    gene_completeness, keymetrics_rows, samplesex_rows, transcripts_rows)
+from chanjo_report.server.constants import LEVELS
+from chanjo_report.server.extensions import replica
+from chanjo_report.server.panels import filter_genes
+
+SECTION_COLUMNS = {
+    'sex': ['sample_id', 'sample', 'group', 'analysis_date', 'sex',
+            'x_coverage', 'y_coverage'],
+    'metrics': (['sample_id', 'sample', 'mean_coverage'] +
+                list(LEVELS.values())),
+    'transcripts': ['sample_id', 'sample', 'level', 'yield', 'missed_count',
+                    'total'],
+}
+SECTIONS = ('sex', 'metrics', 'transcripts')
+
+
+def sex_records(sample_ids, gene_ids=None, level=10):
+    """Generate sex prediction records."""
+    for row in samplesex_rows(sample_ids):
+        record = dict(row)
+        if row['analysis_date']:
+            record['analysis_date'] = row['analysis_date'].isoformat()
+        yield record
+
+
+def metrics_records(sample_ids, gene_ids=None, level=10):
+    """Generate key metrics records."""
+    for row in keymetrics_rows(sample_ids, genes=gene_ids):
+        record = {
+            'sample_id': row.Sample.id,
+            'sample': row.Sample.name or row.Sample.id,
+            'mean_coverage': row.mean_coverage,
+        }
+        for field_id in LEVELS.values():
+            record[field_id] = getattr(row, field_id)
+        yield record
+
+
+def transcript_records(sample_ids, gene_ids=None, level=10):
+    """Generate transcript coverage (yield) records."""
+    for row in transcripts_rows(sample_ids, genes=gene_ids, level=level):
+        yield {
+            'sample_id': row['sample'].id,
+            'sample': row['sample'].name or row['sample'].id,
+            'level': level,
+            'yield': row['yield'],
+            'missed_count': row['missed_count'],
+            'total': row['total'],
+        }
+
+
+SECTION_RECORDS = {
+    'sex': sex_records,
+    'metrics': metrics_records,
+    'transcripts': transcript_records,
+}
+
+
+def section_records(section, sample_ids, gene_ids=None, level=10):
+    """Generate records for one section of the report."""
+    return SECTION_RECORDS[section](sample_ids, gene_ids=gene_ids,
+                                    level=level)
+
+
+def report_data(sample_ids, gene_ids=None, level=10):
+    """Collect records for all sections of the report."""
+    return {section: list(section_records(section, sample_ids,
+                                          gene_ids=gene_ids, level=level))
+            for section in SECTIONS}
+
+
+def iter_csv(section, records):
+    """Generate CSV lines for records of a section, header first."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=SECTION_COLUMNS[section],
+                            extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def heatmap_matrix(samples, genes, level=10):
+    """Lay out the completeness of genes across samples as a matrix.
+
+    ``values[gene_index][sample_index]`` is the average completeness of
+    the transcripts of a gene, floored to one decimal so that incomplete
+    genes never show as 100, or None if the sample has no stats for it.
+
+    Args:
+        samples (List[Sample]): samples in column order
+        genes (List[int]): gene ids or a stored panel (:class:`PanelGenes`)
+        level (Optional[int]): completeness cutoff
+    """
+    sample_index = {sample_obj.id: index for index, sample_obj in enumerate(samples)}
+    db = replica.reader()
+    gene_rows = (db.query(Transcript.gene_id, func.min(Transcript.gene_name))
+                    .filter(filter_genes(Transcript.gene_id, genes))
+                    .group_by(Transcript.gene_id)
+                    .order_by(Transcript.gene_id)
+                    .all())
+    gene_index = {gene_id: index for index, (gene_id, _) in enumerate(gene_rows)}
+    values = [[None] * len(samples) for _ in gene_rows]
+    if samples and gene_rows:
+        rows = gene_completeness(db, list(sample_index), genes, level=level)
+        for gene_id, sample_id, completeness in rows:
+            if completeness is not None:
+                values[gene_index[gene_id]][sample_index[sample_id]] = (
+                    math.floor(completeness * 10) / 10)
+
+    return {
+        'level': level,
+        'samples': [sample_obj.id for sample_obj in samples],
+        'sample_names': [sample_obj.name or sample_obj.id for sample_obj in samples],
+        'genes': [gene_id for gene_id, _ in gene_rows],
+        'gene_names': [gene_name or str(gene_id) for gene_id, gene_name in gene_rows],
+        'values': values,
+    }
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+
+from flask import abort, Blueprint, jsonify, request, Response, stream_with_context
+
+from chanjo_report.server.blueprints.report.utils import (diagnostic_yield, gene_options,
+                                                     map_samples, sample_stamp)
+from chanjo_report.server.cache import make_key
+from chanjo_report.server.extensions import api, cache, replica
+from chanjo_report.server.panels import (delete_panel, genes_key, get_panel,
+                                         list_panels, panel_gene_ids, save_panel)
+from chanjo_report.server.responses import not_modified, set_validators
+from .utils import heatmap_matrix, iter_csv, report_data, section_records, SECTIONS
+
+logger = logging.getLogger(__name__)
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+def export_options():
+    """Collect export options from a JSON body, form data or query string.
+
+    A JSON body (``{"sample_ids": [...], "gene_ids": [...], "level": 10}``)
+    is the most convenient way to pass hundreds of samples.
+    """
+    data = request.get_json(silent=True) or {}
+    sample_ids = data.get('sample_ids') or request.values.getlist('sample_id')
+    gene_ids, level = gene_options(data)
+    if not sample_ids:
+        return abort(400, 'no samples given')
+    return sample_ids, gene_ids, level
+
+
+@api_bp.route('/report', methods=['GET', 'POST'])
+def report():
+    """Export report metrics as JSON or one section as streamed CSV."""
+    sample_ids, gene_ids, level = export_options()
+    data_format = request.values.get('format', 'json')
+    if data_format == 'csv':
+        section = request.values.get('section', 'metrics')
+        if section not in SECTIONS:
+            return abort(400, "unknown section: {}".format(section))
+        records = section_records(section, sample_ids, gene_ids=gene_ids,
+                                  level=level)
+        lines = stream_with_context(iter_csv(section, records))
+        response = Response(lines, mimetype='text/csv')
+        header = "attachment; filename={}.csv".format(section)
+        response.headers['Content-Disposition'] = header
+        return response
+    elif data_format != 'json':
+        return abort(400, "unsupported format: {}".format(data_format))
+
+    data = report_data(sample_ids, gene_ids=gene_ids, level=level)
+    data['level'] = level
+    return jsonify(data)
+
+
+@api_bp.route('/diagnostic-yield', methods=['GET', 'POST'])
+def diagnostic():
+    """Export the diagnostic yield per sample as JSON.
+
+    Samples are given by id or by ``group``; without either, all samples
+    are included.
+    """
+    data = request.get_json(silent=True) or {}
+    sample_ids = data.get('sample_ids') or request.values.getlist('sample_id')
+    group_id = data.get('group') or request.values.get('group')
+    gene_ids, level = gene_options(data)
+
+    results = list(diagnostic_yield(replica.reader(), genes=gene_ids,
+                                    samples=sample_ids,
+                                    group=group_id, level=level))
+    return jsonify(level=level, samples=results)
+
+
+@api_bp.route('/heatmap', methods=['GET', 'POST'])
+def heatmap():
+    """Export the completeness of genes across samples as a JSON matrix.
+
+    Samples are given by id or by ``group``, genes by ``gene_ids`` or
+    ``panel_id``. The ETag changes when any of the samples is reloaded.
+    """
+    data = request.get_json(silent=True) or {}
+    sample_ids = data.get('sample_ids') or request.values.getlist('sample_id')
+    group_id = data.get('group') or request.values.get('group')
+    genes, level = gene_options(data)
+    if not genes:
+        return abort(400, 'provide gene_ids or panel_id')
+
+    samples = sorted(map_samples(group_id=group_id, sample_ids=sample_ids).values(),
+                     key=lambda sample_obj: sample_obj.id)
+    etag = make_key('heatmap', level=level, genes=genes_key(genes),
+                    samples=[sample_stamp(sample_obj.id, sample_obj.created_at)
+                             for sample_obj in samples])
+    response = not_modified(etag)
+    if response is not None:
+        return response
+
+    body = cache.get(etag) if cache.enabled else None
+    if body is None:
+        matrix = heatmap_matrix(samples, genes, level=level)
+        body = json.dumps(matrix, separators=(',', ':'))
+        if cache.enabled:
+            cache.set(etag, body)
+    response = Response(body, mimetype='application/json')
+    return set_validators(response, etag)
+
+
+def panel_data(panel):
+    return dict(id=panel.id, name=panel.name, genes=panel.genes,
+                updated_at=panel.updated_at.isoformat())
+
+
+@api_bp.route('/panels')
+def panels():
+    """List stored gene panels."""
+    return jsonify(panels=[panel_data(panel) for panel in list_panels(api)])
+
+
+@api_bp.route('/panels/<panel_id>', methods=['GET', 'PUT', 'DELETE'])
+def panel(panel_id):
+    """Show, upload (``{"name": ..., "gene_ids": [...]}``) or remove a panel."""
+    if request.method == 'PUT':
+        data = request.get_json(silent=True) or {}
+        try:
+            gene_ids = [int(gene_id) for gene_id in data.get('gene_ids') or []]
+        except (TypeError, ValueError):
+            return abort(400, 'gene ids must be integers')
+        if not gene_ids:
+            return abort(400, 'no genes given')
+        save_panel(api, panel_id, gene_ids, name=data.get('name'))
+
+    panel_obj = get_panel(api, panel_id)
+    if panel_obj is None:
+        return abort(404, "gene panel not found: {}".format(panel_id))
+    if request.method == 'DELETE':
+        delete_panel(api, panel_id)
+        return '', 204
+
+    data = panel_data(panel_obj)
+    data['gene_ids'] = panel_gene_ids(api, panel_id)
+    return jsonify(data)
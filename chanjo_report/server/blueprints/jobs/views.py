@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import functools
+import logging
+import os
+
+from flask import (abort, Blueprint, current_app, jsonify, request, send_file,
+                   url_for)
+from flask_babel import get_locale
+
+from chanjo_report.server.blueprints.report.views import (report_cache_key,
+                                                          report_options)
+from chanjo_report.server.constants import LEVELS
+from chanjo_report.server.extensions import jobs
+from chanjo_report.server.jobs import DONE
+from chanjo_report.server.pdf import write_report
+
+logger = logging.getLogger(__name__)
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+
+def job_response(state, status_code=200):
+    """Describe a job with links to poll it and fetch its result."""
+    data = dict(state)
+    data['url'] = url_for('jobs.job', job_id=state['id'], _external=True)
+    if state['status'] == DONE:
+        data['result_url'] = url_for('jobs.job_pdf', job_id=state['id'],
+                                     _external=True)
+    response = jsonify(data)
+    response.status_code = status_code
+    return response
+
+
+@jobs_bp.route('/pdf', methods=['POST'])
+def submit_pdf():
+    """Queue a PDF report, takes the same options as the PDF view.
+
+    Responds at once with the job to poll; a job for the same report that
+    is already queued, running or done is returned instead of a new one.
+    """
+    sample_ids, extras = report_options()
+    if not sample_ids:
+        return abort(400, 'no samples given')
+    if extras['level'] not in LEVELS:
+        return abort(400, "unsupported level: {}".format(extras['level']))
+    job_id = report_cache_key('pdf', sample_ids, extras)
+
+    params = dict(level=extras['level'], lang=str(get_locale()))
+    if extras['gene_ids']:
+        params['gene_ids'] = ','.join(map(str, extras['gene_ids']))
+    if extras['panel_id']:
+        params['panel_id'] = extras['panel_id']
+    if extras['panel_name']:
+        params['panel_name'] = extras['panel_name']
+    if extras['show_genes']:
+        params['show_genes'] = 'yes'
+    # called with the path to write the PDF to
+    render = functools.partial(write_report, current_app._get_current_object(),
+                               sample_ids, **params)
+    state = jobs.submit(job_id, render)
+    response = job_response(state, status_code=202)
+    response.headers['Location'] = url_for('jobs.job', job_id=job_id,
+                                           _external=True)
+    return response
+
+
+@jobs_bp.route('/<job_id>')
+def job(job_id):
+    """Show the status of a job."""
+    state = jobs.status(job_id)
+    if state is None:
+        return abort(404, "job not found: {}".format(job_id))
+    return job_response(state)
+
+
+@jobs_bp.route('/<job_id>/pdf')
+def job_pdf(job_id):
+    """Download the PDF report of a finished job."""
+    state = jobs.status(job_id)
+    result_path = jobs.result_path(job_id)
+    if state is None or state['status'] != DONE or not os.path.exists(result_path):
+        return abort(404, "no report for job: {}".format(job_id))
+    return send_file(result_path, mimetype='application/pdf',
+                     as_attachment='dl' in request.args,
+                     attachment_filename='coverage-report.pdf')
@@ -1,15 +1,22 @@
 from __future__ import division
+import base64
 import itertools
+import json
 import logging
 
-from flask import abort, flash
-from sqlalchemy.exc import OperationalError
-from sqlalchemy import func
+from flask import abort, flash, request
+from sqlalchemy import and_, case, distinct, func, or_, text
+from sqlalchemy.orm import contains_eager, joinedload
 from chanjo.store.models import Transcript, TranscriptStat, Sample
-from chanjo.sex import predict_sex
 
+from chanjo_report.server import columnar
 from chanjo_report.server.constants import LEVELS
-from chanjo_report.server.extensions import api
+from chanjo_report.server.extensions import api, replica, stores
+from chanjo_report.server.models import GeneStat
+from chanjo_report.server.panels import (filter_genes, panel_gene_ids, panel_genes,
+                                         PanelGenes)
+from chanjo_report.server.sex import sample_sex
+from chanjo_report.server.summary import is_summarized
 
 LOG = logging.getLogger(__name__)
 
@@ -18,6 +25,8 @@ def transcript_coverage(api, gene_id, *sample_ids):
     """Return coverage metrics per transcript for a given gene."""
     query = (api.query(TranscriptStat)
                 .join(TranscriptStat.transcript)
+                .options(contains_eager(TranscriptStat.transcript),
+                         joinedload(TranscriptStat.sample))
                 .filter(Transcript.gene_id == gene_id)
                 .order_by(TranscriptStat.transcript_id,
                           TranscriptStat.sample_id))
@@ -28,60 +37,213 @@ def transcript_coverage(api, gene_id, *sample_ids):
     return tx_groups
 
 
+def encode_cursor(values):
+    """Encode the sort key of a row as an opaque pagination cursor."""
+    raw_cursor = json.dumps(list(values)).encode('utf-8')
+    return base64.urlsafe_b64encode(raw_cursor).decode('ascii')
+
+
+def decode_cursor(cursor, size=3):
+    """Decode a pagination cursor back to a sort key.
+
+    Args:
+        size (Optional[int]): number of values in the sort key
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii'))
+                                  .decode('utf-8'))
+    except (TypeError, ValueError):
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        return abort(400, "invalid cursor: {}".format(cursor))
+    return values
+
+
+def keyset_filter(columns, values, reverse=False):
+    """Filter rows sorted after (or before) a sort key.
+
+    Expands the row value comparison ``(a, b) > (x, y)`` to
+    ``a > x OR (a = x AND b > y)`` which works across SQL dialects.
+
+    Args:
+        columns (List[Column]): columns making up the sort key
+        values (List): sort key of the last row on the previous page
+        reverse (Optional[bool]): filter rows sorted before the key
+    """
+    clauses = []
+    for index, column in enumerate(columns):
+        equals = [prev_column == value for prev_column, value
+                  in zip(columns[:index], values[:index])]
+        compare = (column < values[index]) if reverse else (column > values[index])
+        clauses.append(and_(*(equals + [compare])))
+    return or_(*clauses)
+
+
 def map_samples(group_id=None, sample_ids=None):
+    query = replica.reader().query(Sample)
     if group_id:
-        query = Sample.query.filter(Sample.group_id == group_id)
+        query = query.filter(Sample.group_id == group_id)
     elif sample_ids:
-        query = Sample.query.filter(Sample.id.in_(sample_ids))
-    else:
-        query = Sample.query
+        query = query.filter(Sample.id.in_(sample_ids))
+    samples = {sample_obj.id: sample_obj for sample_obj in query}
+    return samples
+
+
+def store_sample_ids(api, sample_ids):
+    """Return the ids of samples that are loaded in one database."""
+    return [row[0] for row in api.query(Sample.id).filter(Sample.id.in_(sample_ids))]
+
+
+def sample_stamp(sample_id, created_at):
+    """Identify a sample along with when it was loaded."""
+    return "{}@{}".format(sample_id, created_at)
+
+
+def store_sample_stamps(api, sample_ids=None):
+    """Return sample ids and stamps of samples in one database."""
+    query = api.query(Sample.id, Sample.created_at)
+    if sample_ids is not None:
+        query = query.filter(Sample.id.in_(sample_ids))
+    return [(sample_id, sample_stamp(sample_id, created_at))
+            for sample_id, created_at in query]
+
+
+def sample_stamps(sample_ids=None):
+    """Identify samples in every Chanjo database along with when they were loaded.
+
+    Changes when any of the samples is reloaded in Chanjo, for cache keys
+    and ETags.
+
+    Args:
+        sample_ids (Optional[List[str]]): all samples if None
+
+    Returns:
+        List[str]: sorted "<sample id>@<load time>" strings
+    """
+    stamps = {}
+    for _, store_stamps in stores.fan_out(store_sample_stamps, sample_ids):
+        for sample_id, stamp in store_stamps:
+            stamps.setdefault(sample_id, stamp)
+    return sorted(stamps.values())
+
+
+def gene_options(data):
+    """Collect genes and level from a JSON body, form data or query string.
+
+    Genes are given as a list of ``gene_ids`` or as the ``panel_id`` of a
+    stored panel.
+    """
+    panel_id = data.get('panel_id') or request.values.get('panel_id')
+    gene_ids = data.get('gene_ids')
+    if gene_ids is None:
+        raw_gene_ids = request.values.get('gene_ids')
+        gene_ids = raw_gene_ids.split(',') if raw_gene_ids else []
     try:
-        samples = {sample_obj.id: sample_obj for sample_obj in query}
-        return samples
-    except OperationalError as error:
-        LOG.exception(error)
-        api.session.rollback()
-        return abort(500, 'MySQL error, try again')
+        gene_ids = [int(gene_id) for gene_id in gene_ids]
+        level = int(data.get('level') or request.values.get('level') or 10)
+    except ValueError:
+        return abort(400, 'gene ids and level must be integers')
+    if level not in LEVELS:
+        return abort(400, "unsupported level: {}".format(level))
+    if panel_id:
+        panel = panel_genes(api, panel_id)
+        if panel is None:
+            return abort(404, "gene panel not found: {}".format(panel_id))
+        return panel, level
+    return gene_ids, level
+
+
+def store_genes(genes):
+    """Return a gene filter that works in every Chanjo database.
+
+    Stored panels only exist in the main database; with more stores
+    configured, queries filter on the gene ids of the panel instead.
+    """
+    if stores.enabled and isinstance(genes, PanelGenes):
+        return panel_gene_ids(api, genes.id)
+    return genes
+
+
+def federated_rows(func, sample_ids, key, **kwargs):
+    """Generate per-sample rows from every Chanjo database, ordered by sample.
+
+    Args:
+        func (function): returns a list of rows from one database
+        sample_ids (List[str]): samples to generate rows for
+        key (function): return the sample id of a row
+    """
+    rows = {}
+    for _, store_rows in stores.fan_out(func, sample_ids, **kwargs):
+        for row in store_rows:
+            rows.setdefault(key(row), row)
+    for sample_id in sorted(rows):
+        yield rows[sample_id]
+
+
+def store_samplesex(api, sample_ids):
+    """Return sex prediction info rows of samples in one database."""
+    samples = (api.query(Sample).filter(Sample.id.in_(sample_ids))
+                                .order_by(Sample.id)
+                                .all())
+    if not samples:
+        return []
+    predictions = sample_sex(api, [sample_obj.id for sample_obj in samples],
+                             writer=replica.writer(api))
+    return [{
+        'sample_id': sample_obj.id,
+        'sample': sample_obj.name or sample_obj.id,
+        'group': sample_obj.group_name,
+        'analysis_date': sample_obj.created_at,
+        'sex': predictions[sample_obj.id]['sex'],
+        'x_coverage': predictions[sample_obj.id]['x_coverage'],
+        'y_coverage': predictions[sample_obj.id]['y_coverage'],
+    } for sample_obj in samples if sample_obj.id in predictions]
 
 
 def samplesex_rows(sample_ids):
     """Generate sex prediction info rows."""
-    sex_query = (api.query(
-        TranscriptStat.sample_id,
-        Transcript.chromosome,
-        func.avg(TranscriptStat.mean_coverage)
-    ).join(
-        TranscriptStat.transcript
-    ).filter(
-        Transcript.chromosome.in_(['X', 'Y']),
-        TranscriptStat.sample_id.in_(sample_ids)
-    ).group_by(
-        TranscriptStat.sample_id,
-        Transcript.chromosome
-    ))
-
-    samples = itertools.groupby(sex_query, lambda row: row[0])
-    for sample_id, chromosomes in samples:
-        chr_coverage = [coverage for _, _, coverage in chromosomes]
-        LOG.debug('predicting sex')
-        predicted_sex = predict_sex(*chr_coverage)
-        sample_obj = Sample.query.get(sample_id)
-        sample_row = {
-            'sample': sample_obj.name or sample_obj.id,
-            'group': sample_obj.group_name,
-            'analysis_date': sample_obj.created_at,
-            'sex': predicted_sex,
-            'x_coverage': chr_coverage[0],
-            'y_coverage': chr_coverage[1],
-        }
-        yield sample_row
+    return federated_rows(store_samplesex, sample_ids,
+                          key=lambda row: row['sample_id'])
 
 
-def keymetrics_rows(samples_ids, genes=None):
-    """Generate key metrics rows."""
+def summary_average(field_id):
+    """Average a per-gene summary column over its transcripts.
+
+    Each gene is weighted by its transcripts with a value, like ``AVG``
+    over the transcript stats skips NULL values.
+    """
+    column = getattr(GeneStat, field_id)
+    count_column = getattr(GeneStat, "{}_count".format(field_id))
+    return func.sum(column * count_column) / func.sum(count_column)
+
+
+def store_keymetrics(api, samples_ids, genes=None):
+    """Return key metrics rows of samples in one database."""
+    # samples in the other stores would never count as summarized here
+    samples_ids = store_sample_ids(api, samples_ids)
+    if not samples_ids:
+        return []
+    if is_summarized(api, samples_ids):
+        query = (
+            api.query(
+                Sample,
+                summary_average('mean_coverage').label('mean_coverage'),
+                *[summary_average(field_id).label(field_id)
+                  for field_id in LEVELS.values()]
+            )
+            .join(GeneStat, GeneStat.sample_id == Sample.id)
+            .filter(Sample.id.in_(samples_ids))
+            .group_by(Sample.id)
+        )
+        if genes:
+            query = query.filter(filter_genes(GeneStat.gene_id, genes))
+        return query.all()
+    if columnar.numpy_enabled():
+        return columnar.keymetrics_rows(api, samples_ids, genes=genes)
+
     query = (
         api.query(
-            TranscriptStat,
+            Sample,
             func.avg(TranscriptStat.mean_coverage).label('mean_coverage'),
             func.avg(TranscriptStat.completeness_10).label('completeness_10'),
             func.avg(TranscriptStat.completeness_15).label('completeness_15'),
@@ -89,28 +251,150 @@ def keymetrics_rows(samples_ids, genes=None):
             func.avg(TranscriptStat.completeness_50).label('completeness_50'),
             func.avg(TranscriptStat.completeness_100).label('completeness_100'),
         )
-        .filter(TranscriptStat.sample_id.in_(samples_ids))
+        .join(TranscriptStat, TranscriptStat.sample_id == Sample.id)
+        .filter(Sample.id.in_(samples_ids))
+        .group_by(Sample.id)
+    )
+
+    if genes:
+        query = (query.join(TranscriptStat.transcript)
+                      .filter(filter_genes(Transcript.gene_id, genes)))
+    return query.all()
+
+
+def keymetrics_rows(samples_ids, genes=None):
+    """Generate key metrics rows."""
+    return federated_rows(store_keymetrics, samples_ids,
+                          key=lambda row: row.Sample.id,
+                          genes=store_genes(genes))
+
+
+def store_transcript_counts(api, sample_ids, genes=None):
+    """Count all and incompletely covered transcripts per sample.
+
+    Uses conditional aggregation to count missed transcripts at every
+    completeness level in ``LEVELS`` in a single grouped query. Reads from
+    the gene summary when all samples are included in it.
+
+    Args:
+        sample_ids (List[str]): samples to count transcripts for
+        genes (Optional[List[int]]): restrict counts to these genes or
+            to a stored panel (:class:`PanelGenes`)
+
+    Returns:
+        dict: sample id -> row with ``total`` and ``missed_<level>`` columns
+    """
+    if is_summarized(api, sample_ids):
+        total_column = func.sum(GeneStat.transcripts)
+        missed_columns = [
+            (total_column - func.sum(getattr(GeneStat, "covered_{}".format(level))))
+                .label("missed_{}".format(level))
+            for level in LEVELS
+        ]
+        query = (
+            api.query(GeneStat.sample_id, total_column.label('total'),
+                      *missed_columns)
+               .filter(GeneStat.sample_id.in_(sample_ids))
+               .group_by(GeneStat.sample_id)
+        )
+        if genes:
+            query = query.filter(filter_genes(GeneStat.gene_id, genes))
+        return {row.sample_id: row for row in query}
+    if columnar.numpy_enabled():
+        return columnar.transcript_counts(api, sample_ids, genes=genes)
+
+    missed_columns = [
+        func.sum(case([(getattr(TranscriptStat, field_id) < 100, 1)], else_=0))
+            .label("missed_{}".format(level))
+        for level, field_id in LEVELS.items()
+    ]
+    query = (
+        api.query(
+            TranscriptStat.sample_id,
+            func.count(TranscriptStat.id).label('total'),
+            *missed_columns
+        )
+        .filter(TranscriptStat.sample_id.in_(sample_ids))
         .group_by(TranscriptStat.sample_id)
     )
 
     if genes:
         query = (query.join(TranscriptStat.transcript)
-                      .filter(Transcript.gene_id.in_(genes)))
-    return query
+                      .filter(filter_genes(Transcript.gene_id, genes)))
+    return {row.sample_id: row for row in query}
+
 
+def transcript_counts(sample_ids, genes=None):
+    """Count transcripts per sample in every Chanjo database.
+
+    Returns:
+        dict: sample id -> row, see :func:`store_transcript_counts`
+    """
+    counts = {}
+    for _, (_, store_counts) in stores.fan_out(store_transcripts, sample_ids,
+                                               genes=store_genes(genes)):
+        for sample_id, row in store_counts.items():
+            counts.setdefault(sample_id, row)
+    return counts
 
-def transcripts_rows(sample_ids, genes=None, level=10):
-    """Generate metrics rows for transcripts."""
+
+def store_transcripts(api, sample_ids, genes=None):
+    """Look up samples in one database along with their transcript counts.
+
+    Returns:
+        tuple: sample id -> :class:`Sample`, sample id -> counts row
+    """
+    samples = api.query(Sample).filter(Sample.id.in_(sample_ids))
+    samples = {sample_obj.id: sample_obj for sample_obj in samples}
+    if not samples:
+        return samples, {}
+    return samples, store_transcript_counts(api, list(samples), genes=genes)
+
+
+def transcript_samples(sample_ids, genes=None):
+    """Look up samples in every Chanjo database with their transcript counts.
+
+    Returns:
+        dict: sample id -> database API, :class:`Sample` and counts row
+    """
+    found = {}
+    for store, (samples, counts) in stores.fan_out(store_transcripts, sample_ids,
+                                                   genes=store_genes(genes)):
+        for sample_id, sample_obj in samples.items():
+            found.setdefault(sample_id, (store, sample_obj, counts.get(sample_id)))
+    return found
+
+
+def transcripts_rows(sample_ids, genes=None, level=10, found=None):
+    """Generate metrics rows for transcripts.
+
+    Args:
+        found (Optional[Pending]): result of :func:`transcript_samples`
+            computed as a report section
+    """
+    if not sample_ids:
+        return
+    if found is None:
+        found = transcript_samples(sample_ids, genes=genes)
+    else:
+        found = found.get()
+    genes = store_genes(genes)
+    stat_field = getattr(TranscriptStat, LEVELS[level])
     for sample_id in sample_ids:
-        sample_obj = Sample.query.get(sample_id)
-        all_tx = TranscriptStat.query.filter_by(sample_id=sample_id)
+        if sample_id not in found:
+            continue
+        store, sample_obj, sample_counts = found[sample_id]
+        tx_count = sample_counts.total if sample_counts else 0
+        missed_count = (getattr(sample_counts, "missed_{}".format(level)) or 0
+                        if sample_counts else 0)
+        # only queried if the template lists the incompletely covered genes
+        missed_tx = (store.query(TranscriptStat)
+                          .join(TranscriptStat.transcript)
+                          .options(contains_eager(TranscriptStat.transcript))
+                          .filter(TranscriptStat.sample_id == sample_id,
+                                  stat_field < 100))
         if genes:
-            all_tx = (all_tx.join(TranscriptStat.transcript)
-                            .filter(Transcript.gene_id.in_(genes)))
-        tx_count = all_tx.count()
-        stat_field = getattr(TranscriptStat, LEVELS[level])
-        missed_tx = all_tx.filter(stat_field < 100)
-        missed_count = missed_tx.count()
+            missed_tx = missed_tx.filter(filter_genes(Transcript.gene_id, genes))
         if tx_count == 0:
             tx_yield = 0
             flash("no matching transcripts found!")
@@ -125,6 +409,105 @@ def transcripts_rows(sample_ids, genes=None, level=10):
         }
 
 
+def gene_completeness(api, sample_ids, genes, level=10):
+    """Average completeness per gene and sample in one grouped query.
+
+    Reads from the gene summary when all samples are included in it.
+
+    Args:
+        sample_ids (List[str]): samples to include
+        genes (List[int]): gene ids or a stored panel (:class:`PanelGenes`)
+        level (Optional[int]): completeness cutoff
+
+    Returns:
+        Query: gene id, sample id and completeness rows
+    """
+    if is_summarized(api, sample_ids):
+        completeness_col = getattr(GeneStat, LEVELS[level])
+        query = (api.query(GeneStat.gene_id, GeneStat.sample_id,
+                           completeness_col)
+                    .filter(GeneStat.sample_id.in_(sample_ids),
+                            filter_genes(GeneStat.gene_id, genes)))
+        return query
+
+    completeness_col = getattr(TranscriptStat, LEVELS[level])
+    query = (api.query(Transcript.gene_id, TranscriptStat.sample_id,
+                       func.avg(completeness_col))
+                .join(TranscriptStat.transcript)
+                .filter(TranscriptStat.sample_id.in_(sample_ids),
+                        filter_genes(Transcript.gene_id, genes))
+                .group_by(Transcript.gene_id, TranscriptStat.sample_id))
+    return query
+
+
+def aggregate_distinct(api, column):
+    """Aggregate the distinct values of a column per group.
+
+    Uses ``array_agg`` on PostgreSQL and ``group_concat`` elsewhere; parse
+    the result with :func:`split_aggregate`.
+    """
+    if api.engine.dialect.name == 'postgresql':
+        return func.array_agg(distinct(column))
+    if api.engine.dialect.name == 'mysql':
+        # the default limit of 1024 characters truncates long gene lists
+        api.session.execute(text('SET SESSION group_concat_max_len = 1000000'))
+    return func.group_concat(distinct(column))
+
+
+def split_aggregate(value, convert=int):
+    """Parse the result of :func:`aggregate_distinct` to a sorted list."""
+    if value is None:
+        return []
+    if not isinstance(value, (list, tuple)):
+        value = value.split(',')
+    return sorted(convert(item) for item in value)
+
+
+def missed_transcripts(api, sample_ids=None, genes=None, level=10,
+                       summarized=False):
+    """Count incompletely covered transcripts and list their genes.
+
+    Args:
+        sample_ids (Optional[List[str]]): restrict to these samples
+        genes (Optional[List[int]]): restrict to these genes or to a
+            stored panel (:class:`PanelGenes`)
+        level (Optional[int]): completeness cutoff
+        summarized (Optional[bool]): read from the gene summary
+
+    Returns:
+        dict: sample id -> (missed count, sorted gene ids), samples without
+            any incompletely covered transcripts are left out
+    """
+    if summarized:
+        covered_col = getattr(GeneStat, "covered_{}".format(level))
+        missed_query = (
+            api.query(GeneStat.sample_id,
+                      func.sum(GeneStat.transcripts - covered_col),
+                      aggregate_distinct(api, GeneStat.gene_id))
+               .filter(covered_col < GeneStat.transcripts)
+               .group_by(GeneStat.sample_id)
+        )
+        sample_col, gene_col = GeneStat.sample_id, GeneStat.gene_id
+    else:
+        completeness_col = getattr(TranscriptStat, LEVELS[level])
+        missed_query = (
+            api.query(TranscriptStat.sample_id,
+                      func.count(TranscriptStat.id),
+                      aggregate_distinct(api, Transcript.gene_id))
+               .join(TranscriptStat.transcript)
+               .filter(completeness_col < 100)
+               .group_by(TranscriptStat.sample_id)
+        )
+        sample_col, gene_col = TranscriptStat.sample_id, Transcript.gene_id
+
+    if genes:
+        missed_query = missed_query.filter(filter_genes(gene_col, genes))
+    if sample_ids is not None:
+        missed_query = missed_query.filter(sample_col.in_(sample_ids))
+    return {sample_id: (tx_count, split_aggregate(raw_genes))
+            for sample_id, tx_count, raw_genes in missed_query}
+
+
 def diagnostic_yield(api, genes=None, samples=None, group=None, level=10):
     """Calculate transcripts that aren't completely covered.
 
@@ -132,48 +515,48 @@ def diagnostic_yield(api, genes=None, samples=None, group=None, level=10):
     it's hard to know what to do with exons that are covered or
     not covered across multiple samples.
 
+    Missed transcripts and genes are counted for all samples in a single
+    grouped query, or from one columnar fetch with the NumPy engine when
+    samples or a group are given.
+
     Args:
-        sample_id (str): unique sample id
+        genes (Optional[List[int]]): restrict to transcripts of these genes
+            or of a stored panel (:class:`PanelGenes`)
+        samples (Optional[List[str]]): unique sample ids
+        group (Optional[str]): unique group id, used if samples are missing
+        level (Optional[int]): completeness cutoff
     """
-    threshold = 100
-    str_level = "completeness_{}".format(level)
-    completeness_col = getattr(TranscriptStat, str_level)
-
     all_tx = api.query(Transcript)
-    missed_tx = (api.query(TranscriptStat)
-                    .filter(completeness_col < threshold)
-                    .order_by(TranscriptStat.sample_id))
-
     if genes:
-        missed_tx = (missed_tx.join(TranscriptStat.transcript)
-                              .filter(Transcript.gene_id.in_(genes)))
-        all_tx = all_tx.filter(Transcript.gene_id.in_(genes))
+        all_tx = all_tx.filter(filter_genes(Transcript.gene_id, genes))
 
     samples_query = api.query(Sample.id)
     if samples:
         samples_query = samples_query.filter(Sample.id.in_(samples))
-        missed_tx = missed_tx.filter(TranscriptStat.sample_id.in_(samples))
     elif group:
         samples_query = samples_query.filter_by(group_id=group)
-        missed_tx = (missed_tx.join(TranscriptStat.sample).filter(Sample.group_id == group))
 
     all_count = all_tx.count()
     all_samples = [row[0] for row in samples_query.all()]
 
-    sample_groups = itertools.groupby(missed_tx, key=lambda tx: tx.sample_id)
+    summarized = is_summarized(api, all_samples)
+    # without a sample filter the frame would hold the whole stats table
+    if columnar.numpy_enabled() and not summarized and (samples or group):
+        missed = columnar.missed_transcripts(api, all_samples, genes=genes,
+                                             level=level)
+    else:
+        missed = missed_transcripts(api, all_samples if samples or group else None,
+                                    genes=genes, level=level,
+                                    summarized=summarized)
+
     missed_samples = {}
-    for sample_id, tx_models in sample_groups:
-        gene_ids = set()
-        tx_count = 0
-        for tx_model in tx_models:
-            gene_ids.add(tx_model.transcript.gene_id)
-            tx_count += 1
+    for sample_id, (tx_count, gene_ids) in missed.items():
         diagnostic_yield = 100 - (tx_count / all_count * 100)
         result = {'sample_id': sample_id}
         result['diagnostic_yield'] = diagnostic_yield
         result['count'] = tx_count
         result['total_count'] = all_count
-        result['genes'] = list(gene_ids)
+        result['genes'] = gene_ids
         missed_samples[sample_id] = result
 
     for sample_id in all_samples:
@@ -181,5 +564,6 @@ def diagnostic_yield(api, genes=None, samples=None, group=None, level=10):
             yield missed_samples[sample_id]
         else:
             # all transcripts are covered!
-            result = {'sample_id': sample_id, 'diagnostic_yield': 100}
+            result = {'sample_id': sample_id, 'diagnostic_yield': 100,
+                      'count': 0, 'total_count': all_count, 'genes': []}
             yield result
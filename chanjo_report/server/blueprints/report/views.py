@@ -2,98 +2,357 @@
 import logging
 
 from chanjo.store.models import Transcript, TranscriptStat, Sample
-from flask import abort, Blueprint, render_template, request, url_for
-from flask_weasyprint import render_pdf
+from flask import (abort, Blueprint, current_app, make_response, render_template,
+                   request, Response, stream_with_context, url_for)
+from flask_babel import get_locale
+from sqlalchemy.orm import contains_eager, joinedload
 
-from chanjo_report.server.extensions import api
+from chanjo_report.server import columnar
+from chanjo_report.server.cache import make_key
+from chanjo_report.server.extensions import api, cache, replica, sections
+from chanjo_report.server.panels import panel_genes, PanelGenes
+from chanjo_report.server.pdf import write_pdf
 from chanjo_report.server.constants import LEVELS
+from chanjo_report.server.responses import not_modified, set_validators
 from .utils import (samplesex_rows, keymetrics_rows, transcripts_rows, map_samples,
-                    transcript_coverage)
+                    transcript_coverage, encode_cursor, decode_cursor,
+                    keyset_filter, diagnostic_yield, gene_options, sample_stamp,
+                    sample_stamps, transcript_samples)
 
 logger = logging.getLogger(__name__)
 report_bp = Blueprint('report', __name__, template_folder='templates',
                       static_folder='static', static_url_path='/static/report')
 
+# external stylesheets used in the report layout, in order of precedence
+STYLESHEETS = (
+    # latest compiled and minified CSS
+    'https://maxcdn.bootstrapcdn.com/bootstrap/3.3.5/css/bootstrap.min.css',
+    # optional theme
+    'https://bootswatch.com/simplex/bootstrap.min.css',
+)
+
+
+def report_stylesheets():
+    """Return URLs of all stylesheets used in the report layout."""
+    return list(STYLESHEETS) + [url_for('report.static', filename='main.css')]
+
+
+@report_bp.context_processor
+def inject_stylesheets():
+    return dict(stylesheets=report_stylesheets())
+
+
+def use_streaming():
+    """Check if the page should be streamed to the client while rendering."""
+    return bool(request.args.get('stream') or
+                current_app.config.get('CHANJO_STREAM'))
+
+
+def stream_template(template_name, **context):
+    """Render a template as a stream of chunks sent as they are rendered.
+
+    Queries executed from within the template (e.g. generators of rows)
+    then run after the preceding parts of the page have been sent.
+    """
+    app = current_app._get_current_object()
+    app.update_template_context(context)
+    template = app.jinja_env.get_or_select_template(template_name)
+    return stream_with_context(template.stream(context))
+
+
+def cache_stream(cache_key, chunks):
+    """Pass on rendered chunks and cache the full page once complete."""
+    # the app context is gone by the time the last chunk has been sent
+    backend = cache.backend
+
+    def generate():
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        backend.set(cache_key, ''.join(parts))
+
+    return generate()
+
+
+def page_etag(stamps):
+    """Build an ETag for a page that only depends on its URL and samples.
+
+    Args:
+        stamps (List[str]): samples shown on the page, see :func:`sample_stamps`
+    """
+    args = sorted((key, sorted(values)) for key, values
+                  in request.args.lists() if key != 'stream')
+    return make_key(request.endpoint, request.view_args, args,
+                    samples=sorted(stamps), language=str(get_locale()))
+
+
+def conditional(etag, page):
+    """Make a response out of a rendered page with the ETag set."""
+    response = Response(page) if use_streaming() else make_response(page)
+    return set_validators(response, etag)
+
 
 @report_bp.route('/genes/<gene_id>')
 def gene(gene_id):
     """Display coverage information on a gene."""
     sample_ids = request.args.getlist('sample_id')
     sample_dict = map_samples(sample_ids=sample_ids)
-    matching_tx = Transcript.filter_by(gene_id=gene_id).first()
+    etag = page_etag([sample_stamp(sample_obj.id, sample_obj.created_at)
+                      for sample_obj in sample_dict.values()])
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    db = replica.reader()
+    matching_tx = db.query(Transcript).filter_by(gene_id=gene_id).first()
     if matching_tx is None:
         return abort(404, "gene not found: {}".format(gene_id))
     gene_name = matching_tx.gene_name
-    tx_groups = transcript_coverage(api, gene_id, *sample_ids)
+    tx_groups = transcript_coverage(db, gene_id, *sample_ids)
     link = request.args.get('link')
-    return render_template('report/gene.html', gene_id=gene_id,
+    page = render_template('report/gene.html', gene_id=gene_id,
                            gene_name=gene_name, link=link,
                            tx_groups=tx_groups, samples=sample_dict)
+    return set_validators(make_response(page), etag)
 
 
 @report_bp.route('/genes', methods=['GET', 'POST'])
 def genes():
-    """Display an overview of genes that are (un)completely covered."""
-    skip = int(request.args.get('skip', 0))
-    limit = int(request.args.get('limit', 30))
+    """Display an overview of genes that are (un)completely covered.
+
+    Paginated by keyset on (completeness, transcript, sample) so that
+    deep pages are as cheap as the first one. Pass ``after`` or
+    ``before`` cursors to page and ``total`` to also count all rows.
+    """
+    try:
+        limit = int(request.args.get('limit', 30))
+        level = int(request.args.get('level', 10))
+    except ValueError:
+        return abort(400, 'limit and level must be integers')
+    if level not in LEVELS:
+        return abort(400, "unsupported level: {}".format(level))
+    if limit < 1:
+        return abort(400, "limit must be positive: {}".format(limit))
+    after = request.args.get('after')
+    before = request.args.get('before')
+    with_total = bool(request.args.get('total'))
     exonlink = request.args.get('exonlink')
     sample_ids = request.args.getlist('sample_id')
-    samples_q = Sample.filter(Sample.id.in_(sample_ids))
-    level = request.args.get('level', 10)
+    etag = page_etag(sample_stamps(sample_ids or None))
+    response = not_modified(etag) if request.method == 'GET' else None
+    if response is not None:
+        return response
+    db = replica.reader()
+    samples_q = db.query(Sample).filter(Sample.id.in_(sample_ids))
     raw_gene_ids = request.args.get('gene_id')
     completeness_col = getattr(TranscriptStat, "completeness_{}".format(level))
-    query = (api.query(TranscriptStat)
+    sort_columns = (completeness_col, TranscriptStat.transcript_id,
+                    TranscriptStat.sample_id)
+    query = (db.query(TranscriptStat)
                 .join(TranscriptStat.transcript)
-                .filter(completeness_col < 100)
-                .order_by(completeness_col))
+                .filter(completeness_col < 100))
+    # the template shows gene and sample names for every row
+    page_options = (contains_eager(TranscriptStat.transcript),
+                    joinedload(TranscriptStat.sample))
 
     gene_ids = raw_gene_ids.split(',') if raw_gene_ids else []
     if raw_gene_ids:
         query = query.filter(Transcript.gene_id.in_(gene_ids))
     if sample_ids:
         query = query.filter(TranscriptStat.sample_id.in_(sample_ids))
+    total = query.count() if with_total else None
 
-    incomplete_left = query.offset(skip).limit(limit)
-    total = query.count()
-    has_next = total > skip + limit
-    return render_template('report/genes.html', incomplete=incomplete_left,
-                           level=level, skip=skip, limit=limit,
-                           has_next=has_next, gene_ids=gene_ids,
-                           exonlink=exonlink, samples=samples_q,
-                           sample_ids=sample_ids)
+    if before:
+        # walk backwards from the cursor and flip the page afterwards
+        page_query = (query.filter(keyset_filter(sort_columns,
+                                                 decode_cursor(before),
+                                                 reverse=True))
+                           .order_by(*[column.desc() for column in sort_columns]))
+    else:
+        page_query = query.order_by(*sort_columns)
+        if after:
+            page_query = page_query.filter(keyset_filter(sort_columns,
+                                                         decode_cursor(after)))
 
+    # fetch one extra row to find out if there are more pages
+    incomplete_left = (page_query.options(*page_options)
+                                 .limit(limit + 1).all())
+    has_more = len(incomplete_left) > limit
+    incomplete_left = incomplete_left[:limit]
+    if before:
+        incomplete_left.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = bool(after), has_more
 
-@report_bp.route('/report', methods=['GET', 'POST'])
-def report():
-    """Generate a coverage report for a group of samples."""
+    def row_cursor(tx_stat):
+        return encode_cursor([getattr(tx_stat, completeness_col.key),
+                              tx_stat.transcript_id, tx_stat.sample_id])
+
+    prev_cursor = row_cursor(incomplete_left[0]) if incomplete_left else None
+    next_cursor = row_cursor(incomplete_left[-1]) if incomplete_left else None
+    render = stream_template if use_streaming() else render_template
+    page = render('report/genes.html', incomplete=incomplete_left,
+                  level=level, limit=limit, total=total, with_total=with_total,
+                  has_prev=has_prev, has_next=has_next,
+                  prev_cursor=prev_cursor, next_cursor=next_cursor,
+                  gene_ids=gene_ids, exonlink=exonlink,
+                  samples=samples_q, sample_ids=sample_ids)
+    return conditional(etag, page)
+
+
+@report_bp.route('/diagnostic-yield')
+def diagnostic():
+    """Display the share of completely covered transcripts per sample."""
+    sample_ids = request.args.getlist('sample_id')
+    group_id = request.args.get('group')
+    genes, level = gene_options({})
+    panel = genes if isinstance(genes, PanelGenes) else None
+    gene_ids = [] if panel else genes
+    results = list(diagnostic_yield(replica.reader(), genes=genes,
+                                    samples=sample_ids, group=group_id,
+                                    level=level))
+    samples = map_samples(group_id=group_id, sample_ids=sample_ids)
+    return render_template('report/diagnostic_yield.html', results=results,
+                           samples=samples, sample_ids=sample_ids,
+                           group_id=group_id, gene_ids=gene_ids, panel=panel,
+                           level=level, levels=LEVELS)
+
+
+@report_bp.route('/heatmap')
+def heatmap():
+    """Display the completeness of genes across a cohort of samples.
+
+    The matrix is fetched from the API and drawn in the browser.
+    """
+    _, level = gene_options({})
+    args = request.args.to_dict(flat=False)
+    level_urls = [(level_id, url_for('report.heatmap', **dict(args, level=level_id)))
+                  for level_id in LEVELS]
+    return render_template('report/heatmap.html', level=level,
+                           level_urls=level_urls,
+                           data_url=url_for('api.heatmap', **args))
+
+
+def report_options():
+    """Collect report options from the query string or form data."""
     sample_ids = request.args.getlist('sample_id') or request.form.getlist('sample_id')
     raw_gene_ids = (request.args.get('gene_ids') or request.form.get('gene_ids'))
-    if raw_gene_ids:
-        gene_ids = [int(gene_id.strip()) for gene_id in raw_gene_ids.split(',')]
-    else:
-        gene_ids = []
-    level = int(request.args.get('level') or request.form.get('level') or 10)
+    try:
+        gene_ids = ([int(gene_id.strip()) for gene_id in raw_gene_ids.split(',')]
+                    if raw_gene_ids else [])
+        level = int(request.args.get('level') or request.form.get('level') or 10)
+    except ValueError:
+        return abort(400, 'gene ids and level must be integers')
+    if level not in LEVELS:
+        return abort(400, "unsupported level: {}".format(level))
     extras = {
         'panel_name': (request.args.get('panel_name') or request.form.get('panel_name')),
         'level': level,
         'gene_ids': gene_ids,
         'show_genes': any([request.args.get('show_genes'), request.form.get('show_genes')]),
     }
+    # genes to filter queries by: a stored panel or the listed gene ids
+    extras['panel_id'] = request.args.get('panel_id') or request.form.get('panel_id')
+    extras['genes'] = request_panel(extras['panel_id']) or gene_ids
+    if extras['panel_id'] and not extras['panel_name']:
+        extras['panel_name'] = extras['genes'].name
+    return sample_ids, extras
+
+
+def request_panel(panel_id):
+    """Look up a stored gene panel requested by id."""
+    if not panel_id:
+        return None
+    panel = panel_genes(api, panel_id)
+    if panel is None:
+        return abort(404, "gene panel not found: {}".format(panel_id))
+    return panel
+
+
+def report_cache_key(kind, sample_ids, extras):
+    """Build a cache key for a report that ignores parameter order.
+
+    Includes when each sample was loaded so that reloading a sample in
+    Chanjo invalidates cached reports it is part of. Also used as ETag.
+    """
+    panel = extras['genes'] if extras['panel_id'] else None
+    return make_key(kind, samples=sample_stamps(sample_ids),
+                    genes=sorted(extras['gene_ids']),
+                    panel=panel.key if panel else None, level=extras['level'],
+                    show_genes=extras['show_genes'],
+                    panel_name=extras['panel_name'], language=str(get_locale()))
+
+
+def render_report(sample_ids, extras, pdf=False, stream=False):
+    """Render the coverage report HTML for a group of samples.
+
+    The queries of each section start right away and run concurrently;
+    the template waits for a section when it gets to it. With ``stream``
+    the page is returned as a generator of chunks so that the header is
+    sent while the sections are still queried.
+    """
+    gene_ids = extras['genes']
+    level = extras['level']
     samples = Sample.query.filter(Sample.id.in_(sample_ids))
-    sex_rows = samplesex_rows(sample_ids)
-    metrics_rows = keymetrics_rows(sample_ids, genes=gene_ids)
-    tx_rows = transcripts_rows(sample_ids, genes=gene_ids, level=level)
-    return render_template('report/report.html', extras=extras,
-                           samples=samples, sex_rows=sex_rows,
-                           sample_ids=sample_ids, levels=LEVELS,
-                           metrics_rows=metrics_rows, tx_rows=tx_rows)
+    if columnar.numpy_enabled():
+        # the metrics and transcripts sections compute on the same frame
+        columnar.frame_cache()
+    results = sections.run([
+        ('transcripts', lambda: transcript_samples(sample_ids, genes=gene_ids)),
+        ('metrics', lambda: list(keymetrics_rows(sample_ids, genes=gene_ids))),
+        ('sex', lambda: list(samplesex_rows(sample_ids))),
+    ])
+    tx_rows = transcripts_rows(sample_ids, genes=gene_ids, level=level,
+                               found=results['transcripts'])
+    render = stream_template if stream else render_template
+    return render('report/report.html', extras=extras,
+                  samples=samples, sex_rows=results['sex'],
+                  sample_ids=sample_ids, levels=LEVELS,
+                  metrics_rows=results['metrics'], tx_rows=tx_rows,
+                  pdf=pdf)
+
+
+@report_bp.route('/report', methods=['GET', 'POST'])
+def report():
+    """Generate a coverage report for a group of samples.
+
+    The cache key doubles as ETag: reloading a report that the client
+    already has costs a single query for the sample load times.
+    """
+    sample_ids, extras = report_options()
+    cache_key = report_cache_key('html', sample_ids, extras)
+    response = not_modified(cache_key) if request.method == 'GET' else None
+    if response is not None:
+        return response
+    html = cache.get(cache_key) if cache.enabled else None
+    if html is None:
+        if use_streaming():
+            chunks = render_report(sample_ids, extras, stream=True)
+            if cache.enabled:
+                chunks = cache_stream(cache_key, chunks)
+            return conditional(cache_key, chunks)
+        html = render_report(sample_ids, extras)
+        if cache.enabled:
+            cache.set(cache_key, html)
+    return set_validators(make_response(html), cache_key)
 
 
 @report_bp.route('/report/pdf', methods=['GET', 'POST'])
 def pdf():
-    data_dict = request.form if request.method == 'POST' else request.args
-    # make a PDF from another view
-    response = render_pdf(url_for('report.report', **data_dict))
+    sample_ids, extras = report_options()
+    cache_key = report_cache_key('pdf', sample_ids, extras)
+    response = not_modified(cache_key) if request.method == 'GET' else None
+    if response is not None:
+        return response
+    pdf_data = cache.get(cache_key) if cache.enabled else None
+    if pdf_data is None:
+        html = render_report(sample_ids, extras, pdf=True)
+        pdf_data = write_pdf(html, stylesheets=report_stylesheets())
+        if cache.enabled:
+            cache.set(cache_key, pdf_data)
+    response = set_validators(make_response(pdf_data), cache_key)
+    response.mimetype = 'application/pdf'
 
     # check if the request is to download the file right away
     if 'dl' in request.args:
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""Cache for rendered reports.
+
+Backends share a minimal ``get``/``set``/``clear`` interface so that new
+ones can be plugged in through the ``CHANJO_CACHE`` config option.
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+from flask import current_app
+
+LOG = logging.getLogger(__name__)
+
+
+def make_key(*parts, **params):
+    """Build a stable cache key from positional parts and named params.
+
+    Named params are serialized with sorted keys so that the order in which
+    they were given doesn't matter; values that should be order
+    insensitive (like sample ids) must be sorted by the caller.
+    """
+    raw_key = json.dumps([parts, params], sort_keys=True, default=str)
+    return hashlib.sha1(raw_key.encode('utf-8')).hexdigest()
+
+
+class NullCache(object):
+
+    """Backend that doesn't cache anything."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def clear(self):
+        pass
+
+
+class LRUCache(object):
+
+    """In-process cache that evicts the least recently used entries.
+
+    Args:
+        maxsize (int): max number of entries to keep
+        timeout (int): seconds until an entry expires, 0 means never
+    """
+
+    def __init__(self, maxsize=128, timeout=300):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires and expires < time.time():
+                return None
+            # re-insert to mark as most recently used
+            self._entries[key] = entry
+            return value
+
+    def set(self, key, value):
+        expires = (time.time() + self.timeout) if self.timeout else 0
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FileSystemCache(object):
+
+    """Cache that stores entries as files to survive worker restarts.
+
+    Args:
+        directory (str): folder to store cache files in
+        timeout (int): seconds until an entry expires, 0 means never
+        threshold (int): max number of files before pruning
+    """
+
+    def __init__(self, directory, timeout=300, threshold=500):
+        self.directory = directory
+        self.timeout = timeout
+        self.threshold = threshold
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _files(self):
+        return [self._path(name) for name in os.listdir(self.directory)
+                if not name.startswith('.')]
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as handle:
+                expires, value = pickle.load(handle)
+        except (IOError, OSError, EOFError, pickle.PickleError):
+            return None
+        if expires and expires < time.time():
+            return None
+        return value
+
+    def set(self, key, value):
+        self._prune()
+        expires = (time.time() + self.timeout) if self.timeout else 0
+        # write to a temp file first so readers never see partial entries
+        handle, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.')
+        try:
+            with os.fdopen(handle, 'wb') as tmp_file:
+                pickle.dump((expires, value), tmp_file,
+                            pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_path, self._path(key))
+        except (IOError, OSError) as error:
+            LOG.warning("unable to write cache entry: %s", error)
+
+    def _prune(self):
+        paths = self._files()
+        if len(paths) < self.threshold:
+            return
+        # remove the oldest entries until we are below the threshold again
+        paths.sort(key=lambda path: os.path.getmtime(path))
+        for path in paths[:len(paths) - self.threshold + 1]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        for path in self._files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class ReportCache(object):
+
+    """Flask extension giving access to the configured cache backend.
+
+    Config:
+        CHANJO_CACHE (str): 'memory', 'filesystem' or None to disable
+        CHANJO_CACHE_DIR (str): folder for the 'filesystem' backend
+        CHANJO_CACHE_TIMEOUT (int): seconds until an entry expires
+        CHANJO_CACHE_SIZE (int): max number of entries to keep
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('CHANJO_CACHE')
+        timeout = app.config.get('CHANJO_CACHE_TIMEOUT', 300)
+        size = app.config.get('CHANJO_CACHE_SIZE', 128)
+        if backend == 'memory':
+            cache = LRUCache(maxsize=size, timeout=timeout)
+        elif backend == 'filesystem':
+            directory = (app.config.get('CHANJO_CACHE_DIR') or
+                         os.path.join(app.instance_path, 'cache'))
+            cache = FileSystemCache(directory, timeout=timeout,
+                                    threshold=size)
+        elif backend:
+            raise ValueError("unknown cache backend: {}".format(backend))
+        else:
+            cache = NullCache()
+        app.extensions['chanjo_cache'] = cache
+
+    @property
+    def backend(self):
+        return current_app.extensions['chanjo_cache']
+
+    @property
+    def enabled(self):
+        """Check if a caching backend is configured."""
+        return not isinstance(self.backend, NullCache)
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value):
+        return self.backend.set(key, value)
+
+    def clear(self):
+        return self.backend.clear()
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""Report aggregates computed on columnar NumPy arrays.
+
+For cohorts of hundreds of samples, building ORM objects and grouping
+them in Python is slow and memory hungry. With ``CHANJO_ENGINE =
+'numpy'`` the transcript stats needed for a report are fetched once per
+request as plain columns and every per-sample aggregate is computed with
+vectorized operations. Results are the same lightweight rows the SQL
+path returns. Install with ``pip install chanjo-report[numpy]``; NumPy is
+only imported once the engine is used.
+"""
+from __future__ import division
+from collections import namedtuple
+import logging
+import threading
+
+from chanjo.store.models import Sample, Transcript, TranscriptStat
+from flask import current_app, g, has_app_context
+from sqlalchemy import select
+
+from .constants import LEVELS
+from .panels import filter_genes, genes_key
+
+np = None
+
+LOG = logging.getLogger(__name__)
+
+ENGINES = ('sql', 'numpy')
+# rows converted to arrays at a time, bounds the number of row tuples alive
+CHUNK_SIZE = 50000
+
+MetricsRow = namedtuple('MetricsRow', ['Sample', 'mean_coverage'] +
+                        list(LEVELS.values()))
+CountsRow = namedtuple('CountsRow', ['sample_id', 'total'] +
+                       ["missed_{}".format(level) for level in LEVELS])
+
+
+def load_numpy():
+    """Import NumPy on first use.
+
+    Returns:
+        bool: whether NumPy is installed
+    """
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+        np = numpy
+    return True
+
+
+def numpy_enabled():
+    """Check if the app is configured to use the NumPy engine."""
+    return (has_app_context() and
+            current_app.config.get('CHANJO_ENGINE') == 'numpy' and
+            load_numpy())
+
+
+class CoverageFrame(object):
+
+    """Transcript stats of a set of samples as NumPy arrays, one per column.
+
+    Args:
+        sample_ids (List[str]): sample id of each code in ``sample_codes``
+        sample_codes (ndarray): index into ``sample_ids`` per transcript stat
+        gene_ids (ndarray): gene id per transcript stat
+        columns (dict): float array per stat field, NULL values are NaN
+    """
+
+    FIELDS = ['mean_coverage'] + list(LEVELS.values())
+
+    def __init__(self, sample_ids, sample_codes, gene_ids, columns):
+        self.sample_ids = sample_ids
+        self.sample_codes = sample_codes
+        self.gene_ids = gene_ids
+        self.columns = columns
+
+    @classmethod
+    def load(cls, api, sample_ids, genes=None):
+        """Fetch the transcript stats of samples in one query.
+
+        Args:
+            api: Chanjo database API
+            sample_ids (List[str]): samples to fetch stats for
+            genes (Optional[List[int]]): restrict to these genes or to a
+                stored panel (:class:`PanelGenes`)
+        """
+        load_numpy()
+        stat_columns = [getattr(TranscriptStat, field) for field in cls.FIELDS]
+        statement = (
+            select([TranscriptStat.sample_id, Transcript.gene_id] + stat_columns)
+            .select_from(TranscriptStat.__table__.join(
+                Transcript.__table__,
+                Transcript.id == TranscriptStat.transcript_id))
+            .where(TranscriptStat.sample_id.in_(sample_ids))
+        )
+        if genes:
+            statement = statement.where(filter_genes(Transcript.gene_id, genes))
+
+        codes = {}
+        chunks = []
+        result = api.session.execute(statement)
+        while True:
+            rows = result.fetchmany(CHUNK_SIZE)
+            if not rows:
+                break
+            values = list(zip(*rows))
+            sample_codes = [codes.setdefault(sample_id, len(codes))
+                            for sample_id in values[0]]
+            chunks.append([np.array(sample_codes, dtype=np.intp),
+                           np.array(values[1], dtype=np.int64)] +
+                          [np.array(column, dtype=float) for column in values[2:]])
+
+        if chunks:
+            arrays = [np.concatenate(parts) for parts in zip(*chunks)]
+        else:
+            arrays = ([np.empty(0, dtype=np.intp), np.empty(0, dtype=np.int64)] +
+                      [np.empty(0, dtype=float) for _ in cls.FIELDS])
+        ordered_ids = sorted(codes, key=codes.get)
+        return cls(ordered_ids, arrays[0], arrays[1],
+                   dict(zip(cls.FIELDS, arrays[2:])))
+
+    def __len__(self):
+        return len(self.sample_codes)
+
+    def _bincount(self, weights=None, mask=None):
+        codes = self.sample_codes
+        if mask is not None:
+            codes = codes[mask]
+            weights = weights[mask] if weights is not None else None
+        return np.bincount(codes, weights=weights, minlength=len(self.sample_ids))
+
+    def totals(self):
+        """Count transcript stats per sample."""
+        return self._bincount()
+
+    def means(self, field):
+        """Average a column per sample, ignoring NULL values like SQL ``AVG``.
+
+        Returns:
+            ndarray: mean per sample, NaN if a sample has no values
+        """
+        column = self.columns[field]
+        present = ~np.isnan(column)
+        sums = self._bincount(column, mask=present)
+        counts = self._bincount(mask=present)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return sums / counts
+
+    def missed(self, level):
+        """Mask transcript stats that aren't completely covered at a level."""
+        with np.errstate(invalid='ignore'):
+            return self.columns[LEVELS[level]] < 100
+
+    def missed_counts(self, level):
+        """Count incompletely covered transcripts per sample."""
+        return self._bincount(mask=self.missed(level))
+
+    def missed_genes(self, level):
+        """List the distinct genes with incompletely covered transcripts.
+
+        Returns:
+            dict: sample id -> sorted gene ids, samples without any are left out
+        """
+        mask = self.missed(level)
+        pairs = np.unique(np.stack([self.sample_codes[mask],
+                                    self.gene_ids[mask]], axis=1), axis=0)
+        codes, starts = np.unique(pairs[:, 0], return_index=True)
+        groups = np.split(pairs[:, 1], starts[1:])
+        return {self.sample_ids[code]: group.tolist()
+                for code, group in zip(codes, groups)}
+
+
+class FrameCache(object):
+
+    """Coverage frames fetched by a request, shared with its report sections."""
+
+    def __init__(self):
+        self.frames = {}
+        self._lock = threading.Lock()
+
+    def get(self, api, sample_ids, genes=None):
+        key = (str(api.engine.url), tuple(sorted(set(sample_ids))),
+               str(genes_key(genes)))
+        # a section needing the same frame waits for the first to fetch it
+        with self._lock:
+            if key not in self.frames:
+                self.frames[key] = CoverageFrame.load(api, list(key[1]),
+                                                      genes=genes)
+                LOG.debug("loaded %s transcript stats into a frame",
+                          len(self.frames[key]))
+            return self.frames[key]
+
+
+def frame_cache():
+    """Return the coverage frames of the current request.
+
+    Set it up before starting report sections for them to share it.
+    """
+    if 'chanjo_frames' not in g:
+        g.chanjo_frames = FrameCache()
+    return g.chanjo_frames
+
+
+def load_frame(api, sample_ids, genes=None):
+    """Return the coverage frame of samples, fetched at most once per request."""
+    return frame_cache().get(api, sample_ids, genes=genes)
+
+
+def as_number(value):
+    return None if np.isnan(value) else float(value)
+
+
+def keymetrics_rows(api, sample_ids, genes=None):
+    """Average coverage and completeness per sample, see the SQL version."""
+    frame = load_frame(api, sample_ids, genes=genes)
+    if not frame.sample_ids:
+        return []
+    samples = {sample_obj.id: sample_obj for sample_obj
+               in api.query(Sample).filter(Sample.id.in_(frame.sample_ids))}
+    means = [frame.means(field) for field in frame.FIELDS]
+    order = sorted(range(len(frame.sample_ids)), key=frame.sample_ids.__getitem__)
+    return [MetricsRow(samples[frame.sample_ids[code]],
+                       *[as_number(column[code]) for column in means])
+            for code in order]
+
+
+def transcript_counts(api, sample_ids, genes=None):
+    """Count all and incompletely covered transcripts per sample.
+
+    Returns:
+        dict: sample id -> :class:`CountsRow`
+    """
+    frame = load_frame(api, sample_ids, genes=genes)
+    totals = frame.totals()
+    missed = [frame.missed_counts(level) for level in LEVELS]
+    return {sample_id: CountsRow(sample_id, int(totals[code]),
+                                 *[int(counts[code]) for counts in missed])
+            for code, sample_id in enumerate(frame.sample_ids)}
+
+
+def missed_transcripts(api, sample_ids, genes=None, level=10):
+    """Count incompletely covered transcripts and list their genes.
+
+    Returns:
+        dict: sample id -> (missed count, sorted gene ids), samples without
+            any incompletely covered transcripts are left out
+    """
+    frame = load_frame(api, sample_ids, genes=genes)
+    counts = dict(zip(frame.sample_ids, frame.missed_counts(level).tolist()))
+    return {sample_id: (int(counts[sample_id]), gene_ids)
+            for sample_id, gene_ids in frame.missed_genes(level).items()}
@@ -1,5 +1,4 @@
 # -*- coding: utf-8 -*-
-from .blueprints import report_bp, index_bp
 
 
 class BaseConfig(object):
@@ -14,7 +13,57 @@ class BaseConfig(object):
     # http://flask.pocoo.org/docs/quickstart/#sessions
     SECRET_KEY = 'secret key'
 
-    BLUEPRINTS = (index_bp, report_bp)
+    # blueprints or their import paths, imported when the app is created
+    BLUEPRINTS = (
+        'chanjo_report.server.blueprints.index:index_bp',
+        'chanjo_report.server.blueprints.report:report_bp',
+        'chanjo_report.server.blueprints.api:api_bp',
+        'chanjo_report.server.blueprints.jobs:jobs_bp',
+    )
+
+    # replace connections that were closed by the database server
+    SQLALCHEMY_POOL_PRE_PING = True
+
+    # cache for rendered reports: 'memory', 'filesystem' or None
+    CHANJO_CACHE = None
+    CHANJO_CACHE_DIR = None
+    CHANJO_CACHE_TIMEOUT = 300
+    CHANJO_CACHE_SIZE = 128
+
+    # send pages to the client while they are rendered, also set by ?stream=1
+    CHANJO_STREAM = False
+
+    # background PDF jobs, results are stored in the instance folder by default
+    CHANJO_JOBS_DIR = None
+    CHANJO_JOBS_WORKERS = 2
+    CHANJO_JOBS_TIMEOUT = 3600
+    CHANJO_JOBS_STALL_TIMEOUT = 60
+
+    # compress responses with gzip (or Brotli if installed) and serve
+    # precompressed static files, see server/responses.py
+    CHANJO_COMPRESS = True
+
+    # read-only replica for report queries, see server/replica.py
+    CHANJO_REPLICA_URI = None
+    CHANJO_REPLICA_MAX_LAG = 300
+    CHANJO_REPLICA_CHECK_INTERVAL = 10
+
+    # threads querying the sections of reports, 0 to query them in turn;
+    # None for one per section and server thread, see server/sections.py
+    CHANJO_SECTION_WORKERS = None
+    CHANJO_SERVER_THREADS = 1
+
+    # more Chanjo databases to report on, name -> URI, see server/stores.py
+    CHANJO_STORES = None
+    CHANJO_STORES_WORKERS = None
+
+    # compute report aggregates with 'sql' or 'numpy', see server/columnar.py
+    CHANJO_ENGINE = 'sql'
+
+    # per-request query and render timings, see server/metrics.py
+    CHANJO_TIMING = True
+    CHANJO_METRICS = False
+    CHANJO_METRICS_SLOW = None
 
 
 class DefaultConfig(BaseConfig):
@@ -27,7 +76,10 @@ class DefaultConfig(BaseConfig):
 
 class ProdConfig(DefaultConfig):
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # recycle connections before MySQL's wait_timeout closes them
+    SQLALCHEMY_POOL_RECYCLE = 3600
     DEBUG = False
+    CHANJO_CACHE = 'memory'
 
 
 class TestConfig(BaseConfig):
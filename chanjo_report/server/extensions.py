@@ -5,4 +5,44 @@ located in app.py
 from chanjo.store.models import BASE
 from flask_alchy import Alchy
 
-api = Alchy(Model=BASE)
+from .cache import ReportCache
+from .jobs import JobQueue
+from .metrics import RequestMetrics
+from .replica import ReadReplica
+from .responses import Compression
+from .sections import ReportSections
+from .stores import ChanjoStores
+
+
+class ChanjoAlchy(Alchy):
+
+    """Alchy extension with more engine options from the app config.
+
+    Config:
+        SQLALCHEMY_POOL_PRE_PING (bool): test connections before using
+            them; replaces connections dropped by the database server
+        SQLALCHEMY_ENGINE_OPTIONS (dict): other ``create_engine`` options
+
+    Pool size, overflow, timeout and recycle are set through the regular
+    Flask-SQLAlchemy options; they are ignored for SQLite which doesn't
+    use a connection queue.
+    """
+
+    def apply_driver_hacks(self, app, info, options):
+        if info.drivername.startswith('sqlite'):
+            for key in ('pool_size', 'max_overflow', 'pool_timeout'):
+                options.pop(key, None)
+        super(ChanjoAlchy, self).apply_driver_hacks(app, info, options)
+        if app.config.get('SQLALCHEMY_POOL_PRE_PING'):
+            options['pool_pre_ping'] = True
+        options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+
+
+api = ChanjoAlchy(Model=BASE)
+cache = ReportCache()
+compression = Compression()
+jobs = JobQueue()
+metrics = RequestMetrics(db=api)
+replica = ReadReplica(db=api, metrics=metrics)
+sections = ReportSections()
+stores = ChanjoStores(db=api, replica=replica, metrics=metrics)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Indexes on the Chanjo tables matching the report queries.
+
+Reports filter transcript stats by sample and completeness, join them to
+transcripts by gene and group them by chromosome. Chanjo itself only
+indexes primary keys, the (sample, transcript) pair and gene ids.
+"""
+import logging
+
+from sqlalchemy import inspect
+
+from .constants import LEVELS
+
+LOG = logging.getLogger(__name__)
+
+# name, table, columns
+REPORT_INDEXES = [
+    ('ix_report_stat_transcript_sample', 'transcript_stat',
+     ('transcript_id', 'sample_id')),
+    ('ix_report_transcript_chromosome', 'transcript', ('chromosome', 'id')),
+] + [
+    ("ix_report_stat_sample_{}".format(field_id), 'transcript_stat',
+     ('sample_id', field_id))
+    for field_id in LEVELS.values()
+]
+
+EXPLAIN_PREFIX = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'mysql': 'EXPLAIN ',
+    'postgresql': 'EXPLAIN ',
+}
+
+
+def index_columns(engine):
+    """Return the leading columns of existing indexes, per table."""
+    inspector = inspect(engine)
+    existing = {}
+    for table in set(index[1] for index in REPORT_INDEXES):
+        columns = [tuple(index['column_names'])
+                   for index in inspector.get_indexes(table)]
+        columns.extend(tuple(constraint['column_names']) for constraint
+                       in inspector.get_unique_constraints(table))
+        columns.append(tuple(inspector.get_pk_constraint(table)
+                             .get('constrained_columns') or ()))
+        existing[table] = columns
+    return existing
+
+
+def missing_indexes(engine, levels=None):
+    """Find report indexes that aren't covered by existing ones.
+
+    An existing index covers a report index if it starts with the same
+    columns.
+
+    Args:
+        engine: SQLAlchemy engine of a Chanjo database
+        levels (Optional[List[int]]): completeness levels to index,
+            defaults to all
+
+    Returns:
+        List[tuple]: name, table and columns of missing indexes
+    """
+    level_fields = [LEVELS[level] for level in (levels or LEVELS)]
+    existing = index_columns(engine)
+    missing = []
+    for name, table, columns in REPORT_INDEXES:
+        if columns[-1].startswith('completeness_') and columns[-1] not in level_fields:
+            continue
+        covered = any(index[:len(columns)] == columns
+                      for index in existing[table])
+        if not covered:
+            missing.append((name, table, columns))
+    return missing
+
+
+def create_indexes(engine, indexes):
+    """Create indexes, see :func:`missing_indexes`."""
+    preparer = engine.dialect.identifier_preparer
+    for name, table, columns in indexes:
+        LOG.info("creating index %s on %s", name, table)
+        statement = "CREATE INDEX {} ON {} ({})".format(
+            preparer.quote(name), preparer.quote(table),
+            ', '.join(preparer.quote(column) for column in columns))
+        with engine.begin() as connection:
+            connection.execute(statement)
+
+
+def explain(connection, statement, parameters):
+    """Return the query plan of a statement as lines of text."""
+    prefix = EXPLAIN_PREFIX.get(connection.dialect.name)
+    if prefix is None:
+        return ["EXPLAIN not supported for {}".format(connection.dialect.name)]
+    rows = connection.execute(prefix + statement, parameters)
+    if connection.dialect.name == 'sqlite':
+        # id, parent, notused, detail
+        return [row[-1] for row in rows]
+    return [' | '.join(str(value) for value in row) for row in rows]
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""Render reports in the background.
+
+Jobs are identified by a key built from their parameters; submitting the
+same report again joins the existing job instead of starting a new one.
+Job state and results are stored as files so that every server process
+can report on them, while rendering happens in a thread pool of the
+process that took the job. No external broker is needed.
+
+The process running a job touches its state file every few seconds. A
+queued or running job that hasn't been touched for a while belongs to a
+process that is gone, e.g. a recycled worker, and is started over when it
+is submitted again.
+"""
+import errno
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from flask import current_app
+
+from .pools import LazyThreadPool
+
+LOG = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class LocalJobs(object):
+
+    """Thread pool running jobs that write their result to a file.
+
+    Args:
+        directory (str): folder for job state and results
+        workers (int): number of threads running jobs
+        timeout (int): seconds to keep finished jobs around
+        stall_timeout (int): seconds without a heartbeat before an
+            unfinished job is considered dead
+    """
+
+    def __init__(self, directory, workers=2, timeout=3600, stall_timeout=60):
+        self.directory = directory
+        self.workers = workers
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        self.pool = LazyThreadPool(workers)
+        # unfinished jobs of this process, kept alive by the heartbeat
+        self._active = set()
+        self._heartbeat = None
+        self._lock = threading.Lock()
+
+    def _path(self, job_id, extension):
+        return os.path.join(self.directory, job_id + extension)
+
+    def result_path(self, job_id):
+        return self._path(job_id, '.result')
+
+    def status(self, job_id):
+        """Return the state of a job or None if it is unknown.
+
+        Unfinished jobs of a process that is gone are reported as failed.
+        """
+        try:
+            with io.open(self._path(job_id, '.json'), encoding='utf-8') as handle:
+                state = json.load(handle)
+        except (IOError, OSError, ValueError):
+            return None
+        if state['status'] in (QUEUED, RUNNING) and self._is_stalled(job_id):
+            state.update(status=FAILED, error='job stopped unexpectedly')
+        return state
+
+    def _is_stalled(self, job_id):
+        try:
+            beat_at = os.path.getmtime(self._path(job_id, '.json'))
+        except OSError:
+            return True
+        return beat_at + self.stall_timeout < time.time()
+
+    def _update(self, job_id, **values):
+        state = self.status(job_id) or dict(id=job_id, created_at=time.time())
+        state.update(values, updated_at=time.time())
+        handle, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.')
+        with io.open(handle, 'w', encoding='utf-8') as tmp_file:
+            tmp_file.write(json.dumps(state))
+        os.rename(tmp_path, self._path(job_id, '.json'))
+        return state
+
+    def is_active(self, state):
+        """Check if a job is queued, running or done and not expired."""
+        if state is None or state['status'] == FAILED:
+            return False
+        return state['updated_at'] + self.timeout > time.time()
+
+    def submit(self, job_id, func):
+        """Start a job unless the same job is already active.
+
+        Args:
+            job_id (str): key identifying the parameters of the job
+            func (callable): called with the path to write the result to
+
+        Returns:
+            dict: state of the new or existing job
+        """
+        state = self.status(job_id)
+        if self.is_active(state):
+            return state
+
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        self.prune()
+        # only one process gets to (re)start the job
+        lock_path = self._path(job_id, '.lock')
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                raise
+            return self.status(job_id) or dict(id=job_id, status=QUEUED)
+        try:
+            state = self.status(job_id)
+            if self.is_active(state):
+                return state
+            state = self._update(job_id, status=QUEUED, error=None,
+                                 created_at=time.time())
+        finally:
+            os.remove(lock_path)
+
+        LOG.info("queued job: %s", job_id)
+        self._start_heartbeat()
+        with self._lock:
+            self._active.add(job_id)
+        self.pool.apply_async(self._run, (job_id, func))
+        return state
+
+    def _run(self, job_id, func):
+        self._update(job_id, status=RUNNING)
+        handle, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.')
+        os.close(handle)
+        try:
+            func(tmp_path)
+            os.rename(tmp_path, self.result_path(job_id))
+        except Exception as error:
+            LOG.exception("job failed: %s", job_id)
+            self._finish(job_id, status=FAILED, error=str(error))
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        else:
+            self._finish(job_id, status=DONE)
+
+    def _finish(self, job_id, **values):
+        with self._lock:
+            self._active.discard(job_id)
+            self._update(job_id, **values)
+
+    def _start_heartbeat(self):
+        # started on first use like the pool, in the process running jobs
+        with self._lock:
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._beat,
+                                                   name='chanjo-jobs-heartbeat')
+                self._heartbeat.daemon = True
+                self._heartbeat.start()
+
+    def _beat(self):
+        """Touch the state files of unfinished jobs of this process."""
+        while True:
+            time.sleep(self.stall_timeout / 4)
+            with self._lock:
+                for job_id in self._active:
+                    try:
+                        os.utime(self._path(job_id, '.json'), None)
+                    except OSError:
+                        pass
+
+    def prune(self):
+        """Remove state and results of jobs that have expired."""
+        expired_before = time.time() - self.timeout
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < expired_before:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+class JobQueue(object):
+
+    """Flask extension giving access to the background job runner.
+
+    Config:
+        CHANJO_JOBS_DIR (str): folder for job state and results
+        CHANJO_JOBS_WORKERS (int): threads rendering reports per process
+        CHANJO_JOBS_TIMEOUT (int): seconds to keep finished jobs around
+        CHANJO_JOBS_STALL_TIMEOUT (int): seconds without a heartbeat before
+            an unfinished job is started over
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        directory = (app.config.get('CHANJO_JOBS_DIR') or
+                     os.path.join(app.instance_path, 'jobs'))
+        jobs = LocalJobs(directory,
+                         workers=app.config.get('CHANJO_JOBS_WORKERS', 2),
+                         timeout=app.config.get('CHANJO_JOBS_TIMEOUT', 3600),
+                         stall_timeout=app.config.get('CHANJO_JOBS_STALL_TIMEOUT', 60))
+        app.extensions['chanjo_jobs'] = jobs
+
+    @property
+    def backend(self):
+        return current_app.extensions['chanjo_jobs']
+
+    def submit(self, job_id, func):
+        return self.backend.submit(job_id, func)
+
+    def status(self, job_id):
+        return self.backend.status(job_id)
+
+    def result_path(self, job_id):
+        return self.backend.result_path(job_id)
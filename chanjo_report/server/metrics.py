@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""Per-request SQL and template timing.
+
+Query count, time spent in the database, the slowest statement and the
+template render time are recorded for every request. They are sent back
+in a ``Server-Timing`` header, logged as one ``key=value`` line and, if
+enabled, aggregated into histograms served on ``/metrics`` in the
+Prometheus text format. Histograms are kept per process. For streamed
+pages only the work done before the first chunk is sent is included.
+"""
+from __future__ import division
+from collections import defaultdict
+import logging
+import threading
+import time
+
+from flask import current_app, g, has_app_context, request, Response
+from flask import signals
+from sqlalchemy import event
+
+LOG = logging.getLogger(__name__)
+
+# upper bounds (seconds) of histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class RequestStats(object):
+
+    """Database and template timings of a single request."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+        self.render_time = 0.0
+        self._render_started = []
+        # report sections add queries from other threads
+        self._lock = threading.Lock()
+
+    def add_query(self, statement, duration):
+        with self._lock:
+            self.queries += 1
+            self.db_time += duration
+            if duration >= self.slowest_time:
+                self.slowest_time = duration
+                self.slowest_statement = statement
+
+    @property
+    def total_time(self):
+        return time.time() - self.started
+
+
+class Histogram(object):
+
+    """Cumulative histogram in the Prometheus sense.
+
+    Args:
+        buckets (List[float]): upper bounds of the buckets
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.total += 1
+        self.sum += value
+        for index, upper_bound in enumerate(self.buckets):
+            if value <= upper_bound:
+                self.counts[index] += 1
+
+    def lines(self, name, labels):
+        """Format the histogram in the Prometheus text format."""
+        for upper_bound, count in zip(self.buckets, self.counts):
+            yield '{}_bucket{{{},le="{}"}} {}'.format(name, labels,
+                                                      upper_bound, count)
+        yield '{}_bucket{{{},le="+Inf"}} {}'.format(name, labels, self.total)
+        yield '{}_sum{{{}}} {}'.format(name, labels, self.sum)
+        yield '{}_count{{{}}} {}'.format(name, labels, self.total)
+
+
+class RequestMetrics(object):
+
+    """Flask extension instrumenting the database engine of ``api``.
+
+    Replicas and stores instrument their engines with :meth:`instrument`.
+
+    Config:
+        CHANJO_TIMING (bool): record timings, add the ``Server-Timing``
+            header and log a line per request
+        CHANJO_METRICS (bool): serve aggregated histograms on ``/metrics``
+        CHANJO_METRICS_SLOW (float): log the slowest statement of requests
+            that spend more seconds than this in the database
+    """
+
+    HISTOGRAMS = (
+        ('chanjo_request_duration_seconds', DURATION_BUCKETS),
+        ('chanjo_request_db_seconds', DURATION_BUCKETS),
+        ('chanjo_request_render_seconds', DURATION_BUCKETS),
+        ('chanjo_request_queries', QUERY_BUCKETS),
+    )
+
+    def __init__(self, db=None, app=None):
+        self.db = db
+        self._engines = set()
+        self._lock = threading.Lock()
+        self._histograms = defaultdict(dict)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, db=None):
+        self.db = db or self.db
+        if not app.config.get('CHANJO_TIMING', True):
+            return
+
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        if signals.signals_available:
+            signals.before_render_template.connect(self.start_render, app)
+            signals.template_rendered.connect(self.finish_render, app)
+
+        if app.config.get('CHANJO_METRICS'):
+            app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def instrument(self, engine, app=None):
+        """Listen to statements executed by an engine, once per engine.
+
+        Args:
+            app (Optional[Flask]): skip the engine if the app doesn't
+                record timings
+        """
+        if app is not None and not app.config.get('CHANJO_TIMING', True):
+            return
+        with self._lock:
+            if engine in self._engines:
+                return
+            self._engines.add(engine)
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+    def start_request(self):
+        self.instrument(self.db.engine)
+        g.chanjo_stats = RequestStats()
+
+    def start_render(self, app, template, context, **extra):
+        stats = g.get('chanjo_stats')
+        if stats is not None:
+            stats._render_started.append(time.time())
+
+    def finish_render(self, app, template, context, **extra):
+        stats = g.get('chanjo_stats')
+        if stats is not None and stats._render_started:
+            # nested renders are already part of the outer render time
+            started = stats._render_started.pop()
+            if not stats._render_started:
+                stats.render_time += time.time() - started
+
+    def finish_request(self, response):
+        stats = g.pop('chanjo_stats', None)
+        if stats is None:
+            return response
+        total_time = stats.total_time
+        response.headers['Server-Timing'] = server_timing(stats, total_time)
+
+        LOG.info("request endpoint=%s status=%s queries=%d db_ms=%.1f "
+                 "slowest_ms=%.1f render_ms=%.1f total_ms=%.1f",
+                 request.endpoint, response.status_code, stats.queries,
+                 stats.db_time * 1000, stats.slowest_time * 1000,
+                 stats.render_time * 1000, total_time * 1000)
+        slow_limit = current_app.config.get('CHANJO_METRICS_SLOW')
+        if slow_limit is not None and stats.db_time > slow_limit:
+            LOG.warning("slow request endpoint=%s slowest statement: %s",
+                        request.endpoint, stats.slowest_statement)
+
+        if current_app.config.get('CHANJO_METRICS'):
+            self.observe(request.endpoint or 'unknown', stats, total_time)
+        return response
+
+    def observe(self, endpoint, stats, total_time):
+        """Add the timings of a request to the histograms."""
+        values = (total_time, stats.db_time, stats.render_time, stats.queries)
+        with self._lock:
+            for (name, buckets), value in zip(self.HISTOGRAMS, values):
+                histogram = self._histograms[name].get(endpoint)
+                if histogram is None:
+                    histogram = self._histograms[name][endpoint] = Histogram(buckets)
+                histogram.observe(value)
+
+    def metrics_view(self):
+        """Serve aggregated histograms in the Prometheus text format."""
+        lines = []
+        with self._lock:
+            for name, _ in self.HISTOGRAMS:
+                lines.append("# TYPE {} histogram".format(name))
+                for endpoint, histogram in sorted(self._histograms[name].items()):
+                    labels = 'endpoint="{}"'.format(endpoint)
+                    lines.extend(histogram.lines(name, labels))
+        return Response('\n'.join(lines) + '\n',
+                        mimetype='text/plain; version=0.0.4')
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    conn.info.setdefault('chanjo_query_start', []).append(time.time())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context,
+                         executemany):
+    starts = conn.info.get('chanjo_query_start')
+    if not starts:
+        return
+    duration = time.time() - starts.pop()
+    stats = g.get('chanjo_stats') if has_app_context() else None
+    if stats is not None:
+        stats.add_query(statement, duration)
+
+
+def server_timing(stats, total_time):
+    """Format request timings as a ``Server-Timing`` header value."""
+    metrics = [
+        ('db', stats.db_time, "{} queries".format(stats.queries)),
+        ('db-slowest', stats.slowest_time, None),
+        ('render', stats.render_time, None),
+        ('total', total_time, None),
+    ]
+    parts = []
+    for name, duration, description in metrics:
+        part = "{};dur={:.1f}".format(name, duration * 1000)
+        if description:
+            part += ';desc="{}"'.format(description)
+        parts.append(part)
+    return ', '.join(parts)
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""Tables owned by Chanjo Report.
+
+They live in the same database as the Chanjo schema but are never written
+to by Chanjo itself. Rows refer to Chanjo samples by id only (no foreign
+keys) so that removing a sample with Chanjo isn't blocked by them.
+:func:`has_tables` checks if they have been created in a database.
+"""
+from datetime import datetime
+import threading
+
+from chanjo.store.models import BASE
+from sqlalchemy import Column, types, UniqueConstraint
+
+
+class GeneStat(BASE):
+
+    """Coverage summary of all transcripts of a gene for one sample.
+
+    Args:
+        sample_id (str): link to sample record
+        gene_id (int): gene the transcripts belong to
+        transcripts (int): number of transcripts summarized
+        mean_coverage (Float): average mean coverage across transcripts
+        completeness_XX (Float): average completeness at XX across transcripts
+        covered_XX (int): number of transcripts fully covered at XX
+        <average>_count (int): number of transcripts with a value that
+            counted towards the average, weights it across genes
+    """
+
+    __tablename__ = 'report_gene_stat'
+    __table_args__ = (UniqueConstraint('sample_id', 'gene_id',
+                                       name='_report_sample_gene_uc'),)
+
+    id = Column(types.Integer, primary_key=True)
+    sample_id = Column(types.String(32), index=True, nullable=False)
+    gene_id = Column(types.Integer, index=True, nullable=False)
+    transcripts = Column(types.Integer, nullable=False)
+
+    mean_coverage = Column(types.Float)
+    completeness_10 = Column(types.Float)
+    completeness_15 = Column(types.Float)
+    completeness_20 = Column(types.Float)
+    completeness_50 = Column(types.Float)
+    completeness_100 = Column(types.Float)
+
+    covered_10 = Column(types.Integer)
+    covered_15 = Column(types.Integer)
+    covered_20 = Column(types.Integer)
+    covered_50 = Column(types.Integer)
+    covered_100 = Column(types.Integer)
+
+    mean_coverage_count = Column(types.Integer)
+    completeness_10_count = Column(types.Integer)
+    completeness_15_count = Column(types.Integer)
+    completeness_20_count = Column(types.Integer)
+    completeness_50_count = Column(types.Integer)
+    completeness_100_count = Column(types.Integer)
+
+
+class SummarizedSample(BASE):
+
+    """Bookkeeping for samples included in the gene summary.
+
+    Args:
+        sample_id (str): link to sample record
+        sample_created_at (DateTime): ``Sample.created_at`` when summarized
+        summarized_at (DateTime): date of the last refresh
+    """
+
+    __tablename__ = 'report_sample'
+
+    sample_id = Column(types.String(32), primary_key=True)
+    sample_created_at = Column(types.DateTime)
+    summarized_at = Column(types.DateTime, default=datetime.now)
+
+
+class SampleSex(BASE):
+
+    """Average coverage on the sex chromosomes and predicted sex of a sample.
+
+    Args:
+        sample_id (str): link to sample record
+        sample_created_at (DateTime): ``Sample.created_at`` when predicted
+        x_coverage (Float): average mean coverage of X transcripts
+        y_coverage (Float): average mean coverage of Y transcripts
+        sex (str): predicted sex
+    """
+
+    __tablename__ = 'report_sample_sex'
+
+    sample_id = Column(types.String(32), primary_key=True)
+    sample_created_at = Column(types.DateTime)
+    x_coverage = Column(types.Float)
+    y_coverage = Column(types.Float)
+    sex = Column(types.String(32))
+
+
+class GenePanel(BASE):
+
+    """Named gene panel that reports can be restricted to.
+
+    Args:
+        id (str): unique panel id
+        name (str): name to display in reports
+        genes (int): number of genes in the panel
+        updated_at (DateTime): date of the last upload
+    """
+
+    __tablename__ = 'report_panel'
+
+    id = Column(types.String(64), primary_key=True)
+    name = Column(types.String(128))
+    genes = Column(types.Integer)
+    updated_at = Column(types.DateTime, default=datetime.now)
+
+
+class PanelGene(BASE):
+
+    """Gene in a stored gene panel.
+
+    Args:
+        panel_id (str): link to panel record
+        gene_id (int): gene in the panel
+    """
+
+    __tablename__ = 'report_panel_gene'
+
+    panel_id = Column(types.String(64), primary_key=True)
+    gene_id = Column(types.Integer, primary_key=True)
+
+
+# (database URI, table name) of report tables known to exist
+_EXISTING_TABLES = set()
+# report sections check for tables concurrently on the first request
+_TABLES_LOCK = threading.Lock()
+
+
+def has_tables(api, tables):
+    """Check if report tables exist in the connected database."""
+    engine = api.engine
+    keys = [(str(engine.url), table.name) for table in tables]
+    if all(key in _EXISTING_TABLES for key in keys):
+        return True
+    with _TABLES_LOCK:
+        if all(key in _EXISTING_TABLES for key in keys):
+            return True
+        connection = engine.connect()
+        try:
+            exists = all(engine.dialect.has_table(connection, table.name)
+                         for table in tables)
+        finally:
+            connection.close()
+        if exists:
+            _EXISTING_TABLES.update(keys)
+    return exists
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Stored gene panels.
+
+Panels of thousands of genes make huge ``IN (...)`` lists. A stored panel
+is uploaded once and report queries filter on a subquery of its genes so
+that the SQL statement is the same size whatever the size of the panel.
+"""
+from datetime import datetime
+import logging
+
+from sqlalchemy import select
+
+from .models import GenePanel, has_tables, PanelGene
+
+LOG = logging.getLogger(__name__)
+
+PANEL_TABLES = (GenePanel.__table__, PanelGene.__table__)
+
+
+class PanelGenes(object):
+
+    """Genes of a stored panel, used in place of a list of gene ids.
+
+    Args:
+        panel (GenePanel): stored panel
+    """
+
+    def __init__(self, panel):
+        self.id = panel.id
+        self.name = panel.name
+        self.updated_at = panel.updated_at
+
+    @property
+    def key(self):
+        """Identify the panel and version, e.g. for cache keys."""
+        return "{}@{}".format(self.id, self.updated_at)
+
+    def select(self):
+        """Select the gene ids of the panel."""
+        return (select([PanelGene.gene_id])
+                .where(PanelGene.panel_id == self.id))
+
+
+def filter_genes(column, genes):
+    """Restrict a gene id column to a list of genes or a stored panel."""
+    if isinstance(genes, PanelGenes):
+        return column.in_(genes.select())
+    return column.in_(genes)
+
+
+def genes_key(genes):
+    """Identify a list of genes or a stored panel, e.g. for cache keys."""
+    if isinstance(genes, PanelGenes):
+        return genes.key
+    return sorted(set(int(gene_id) for gene_id in genes or ()))
+
+
+def get_panel(api, panel_id):
+    """Return a stored panel or None if it doesn't exist."""
+    if not has_tables(api, PANEL_TABLES):
+        return None
+    return api.query(GenePanel).get(panel_id)
+
+
+def panel_genes(api, panel_id):
+    """Return the genes of a stored panel to filter report queries by."""
+    panel = get_panel(api, panel_id)
+    return PanelGenes(panel) if panel else None
+
+
+def panel_gene_ids(api, panel_id):
+    """Return the gene ids of a stored panel."""
+    query = (api.query(PanelGene.gene_id)
+                .filter(PanelGene.panel_id == panel_id)
+                .order_by(PanelGene.gene_id))
+    return [row[0] for row in query]
+
+
+def list_panels(api):
+    """Return all stored panels."""
+    if not has_tables(api, PANEL_TABLES):
+        return []
+    return api.query(GenePanel).order_by(GenePanel.id).all()
+
+
+def save_panel(api, panel_id, gene_ids, name=None, batch_size=5000):
+    """Store a gene panel, replacing an existing panel with the same id.
+
+    Args:
+        api: Chanjo database API (Flask extension or ``ChanjoDB``)
+        panel_id (str): unique panel id
+        gene_ids (List[int]): genes in the panel
+        name (Optional[str]): name to display in reports
+        batch_size (Optional[int]): genes per insert statement
+
+    Returns:
+        dict: values of the stored :class:`GenePanel` row
+    """
+    GenePanel.metadata.create_all(bind=api.engine, tables=PANEL_TABLES)
+    gene_ids = sorted(set(int(gene_id) for gene_id in gene_ids))
+    panel = dict(id=panel_id, name=name or panel_id, genes=len(gene_ids),
+                 updated_at=datetime.now())
+    panel_table, gene_table = PANEL_TABLES
+    with api.engine.begin() as connection:
+        delete_rows(connection, panel_id)
+        connection.execute(panel_table.insert(), panel)
+        for index in range(0, len(gene_ids), batch_size):
+            batch = gene_ids[index:index + batch_size]
+            connection.execute(gene_table.insert(),
+                               [dict(panel_id=panel_id, gene_id=gene_id)
+                                for gene_id in batch])
+    LOG.info("stored panel %s with %s genes", panel_id, len(gene_ids))
+    return panel
+
+
+def delete_rows(connection, panel_id):
+    panel_table, gene_table = PANEL_TABLES
+    connection.execute(gene_table.delete().where(gene_table.c.panel_id == panel_id))
+    connection.execute(panel_table.delete().where(panel_table.c.id == panel_id))
+
+
+def delete_panel(api, panel_id):
+    """Remove a stored panel."""
+    if not has_tables(api, PANEL_TABLES):
+        return
+    with api.engine.begin() as connection:
+        delete_rows(connection, panel_id)
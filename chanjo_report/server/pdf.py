@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""Render PDF documents with WeasyPrint.
+
+Stylesheets, fonts and static files are the same for every report. They
+are fetched and parsed once per process and then shared between
+documents instead of being re-fetched and re-parsed for every PDF.
+
+WeasyPrint (with cairo and pango) is slow to import and only imported
+once the first PDF is rendered.
+"""
+import logging
+import mimetypes
+import threading
+
+from flask import current_app, request, url_for
+from werkzeug.exceptions import HTTPException
+
+try:
+    from urllib.parse import urljoin
+except ImportError:  # pragma: no cover, Python 2
+    from urlparse import urljoin
+
+try:
+    from werkzeug.utils import safe_join
+except ImportError:  # pragma: no cover, werkzeug < 2.0
+    from werkzeug.security import safe_join
+
+LOG = logging.getLogger(__name__)
+# base URL for reports rendered outside of a web server
+BASE_URL = 'http://localhost/'
+
+# fetched static and external resources, by URL
+_resources = {}
+# parsed stylesheets, by URL
+_stylesheets = {}
+_lock = threading.RLock()
+# shared font configuration, False if WeasyPrint doesn't support it
+_font_config = None
+
+
+def font_config():
+    """Return the font configuration shared by all documents, if supported."""
+    global _font_config
+    with _lock:
+        if _font_config is None:
+            try:
+                from weasyprint.fonts import FontConfiguration
+            except ImportError:  # pragma: no cover, older/newer WeasyPrint
+                _font_config = False
+            else:
+                _font_config = FontConfiguration()
+    return _font_config or None
+
+
+def static_filename(app, path):
+    """Find the file on disk that the app serves on a static URL path.
+
+    Args:
+        app (Flask): app to look up static folders for
+        path (str): URL path relative to the app root
+
+    Returns:
+        str: path to the file or None if the URL isn't a static file
+    """
+    adapter = app.url_map.bind('localhost')
+    try:
+        endpoint, values = adapter.match(path.split('?')[0])
+    except HTTPException:
+        return None
+
+    if endpoint == 'static':
+        folder = app.static_folder
+    elif endpoint.endswith('.static'):
+        blueprint = app.blueprints.get(endpoint.rsplit('.', 1)[0])
+        folder = blueprint.static_folder if blueprint else None
+    else:
+        return None
+    return safe_join(folder, values['filename']) if folder else None
+
+
+def read_resource(resource):
+    """Make sure a fetched resource holds its content as a string."""
+    file_obj = resource.pop('file_obj', None)
+    if file_obj is not None:
+        try:
+            resource['string'] = file_obj.read()
+        finally:
+            file_obj.close()
+    return resource
+
+
+def cached_url_fetcher():
+    """Return a WeasyPrint URL fetcher that caches static resources.
+
+    Static files of the app and its blueprints are read straight from
+    disk; external resources (CDN stylesheets, fonts) are fetched over the
+    network once. Other app URLs are dispatched to the app as usual and
+    not cached. Requires a request context.
+    """
+    from flask_weasyprint import make_flask_url_dispatcher, make_url_fetcher
+    import weasyprint
+
+    app = current_app._get_current_object()
+    dispatcher = make_flask_url_dispatcher()
+    app_fetcher = make_url_fetcher(dispatcher)
+
+    def fetch(url):
+        with _lock:
+            resource = _resources.get(url)
+        if resource is None:
+            dispatched = dispatcher(url)
+            if dispatched is None:
+                resource = read_resource(weasyprint.default_url_fetcher(url))
+            else:
+                filename = static_filename(app, dispatched[2])
+                if filename is None:
+                    return app_fetcher(url)
+                with open(filename, 'rb') as handle:
+                    resource = dict(string=handle.read(), redirected_url=url,
+                                    mime_type=mimetypes.guess_type(filename)[0])
+            with _lock:
+                _resources[url] = resource
+        # WeasyPrint fills in missing keys, don't let it touch the cache
+        return dict(resource)
+
+    return fetch
+
+
+def stylesheet(url, url_fetcher):
+    """Return the parsed stylesheet for a URL, parsing it only once."""
+    import weasyprint
+
+    with _lock:
+        css = _stylesheets.get(url)
+        if css is None:
+            LOG.debug("parsing stylesheet: %s", url)
+            options = dict(url=url, url_fetcher=url_fetcher)
+            fonts = font_config()
+            if fonts is not None:
+                options['font_config'] = fonts
+            css = weasyprint.CSS(**options)
+            _stylesheets[url] = css
+    return css
+
+
+def write_pdf(html, stylesheets=None, target=None):
+    """Render HTML from the current request to a PDF document.
+
+    Args:
+        html (str): HTML document without stylesheet links
+        stylesheets (Optional[List[str]]): URLs of stylesheets to apply
+        target (Optional[str]): path to write the PDF to
+
+    Returns:
+        bytes: the PDF document unless ``target`` is given
+    """
+    import weasyprint
+
+    url_fetcher = cached_url_fetcher()
+    css_objs = [stylesheet(urljoin(request.url, url), url_fetcher)
+                for url in (stylesheets or [])]
+    document = weasyprint.HTML(string=html, base_url=request.url,
+                               url_fetcher=url_fetcher)
+    options = dict(stylesheets=css_objs)
+    fonts = font_config()
+    if fonts is not None:
+        options['font_config'] = fonts
+    return document.write_pdf(target, **options)
+
+
+def write_report(app, sample_ids, target=None, **params):
+    """Render the PDF report for a set of samples in-process.
+
+    The request is dispatched directly to the app's PDF view; no server is
+    involved and stylesheets are shared between reports in the process.
+
+    Args:
+        app (Flask): report app
+        sample_ids (List[str]): samples to include in the report
+        target (Optional[str]): path to write the PDF to
+        params: other report options like ``level`` or ``gene_ids``
+
+    Returns:
+        bytes: the PDF document unless ``target`` is given
+    """
+    with app.test_request_context(base_url=BASE_URL):
+        pdf_url = url_for('report.pdf', sample_id=sample_ids, **params)
+
+    with app.test_request_context(pdf_url, base_url=BASE_URL):
+        response = app.full_dispatch_request()
+        if response.status_code != 200:
+            raise RuntimeError("unable to render report: {}"
+                               .format(response.status))
+        pdf_data = response.get_data()
+
+    if target is None:
+        return pdf_data
+    with open(target, 'wb') as handle:
+        handle.write(pdf_data)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Thread pools of background jobs, stores and report sections."""
+import atexit
+from multiprocessing.pool import ThreadPool
+import threading
+
+
+class LazyThreadPool(object):
+
+    """Thread pool that is started on first use.
+
+    Gunicorn forks workers after loading the app and threads don't survive
+    the fork, so each worker starts its own pool. The pool is closed when
+    the interpreter exits.
+
+    Args:
+        workers (int): number of threads
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPool(processes=self.workers)
+                atexit.register(self._pool.close)
+            return self._pool
+
+    def apply_async(self, func, args=()):
+        """Call a function in a thread of the pool.
+
+        Returns:
+            AsyncResult: wait for the result with ``get``
+        """
+        return self.pool.apply_async(func, args)
+
+    def close(self):
+        """Stop accepting work, if the pool was ever started."""
+        if self._pool is not None:
+            self._pool.close()
+
+    def join(self):
+        """Wait for the threads to finish after :meth:`close`."""
+        if self._pool is not None:
+            self._pool.join()
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""Route report queries to a read-only replica of the main database.
+
+Report aggregates are heavy and shouldn't compete with ``chanjo load``
+writing to the primary. With ``CHANJO_REPLICA_URI`` set, report queries
+read from the replica as long as it keeps up: the replica is considered
+stale once it has been missing samples loaded into the primary for more
+than ``CHANJO_REPLICA_MAX_LAG`` seconds, and reads then go to the primary
+until it has caught up. Stored panels count like samples. A replica that
+can't be reached is skipped in the same way. Checks are cached for
+``CHANJO_REPLICA_CHECK_INTERVAL`` seconds.
+
+The database picked is kept for the rest of the request so that cache keys
+and ETags are read from the same database as the page they identify.
+"""
+from datetime import datetime
+import logging
+import threading
+import time
+
+from chanjo.store.models import Sample
+from flask import current_app, g
+from sqlalchemy import func
+from sqlalchemy.exc import DBAPIError
+
+from .models import GenePanel, has_tables
+from .panels import PANEL_TABLES
+from .stores import connect
+
+LOG = logging.getLogger(__name__)
+
+
+def missing_since(primary, replica, column):
+    """Return when the first change missing in the replica was made.
+
+    Args:
+        column: timestamp of the changes, e.g. when samples were loaded
+    """
+    latest = replica.query(func.max(column)).scalar()
+    query = primary.query(func.min(column))
+    if latest is not None:
+        query = query.filter(column > latest)
+    return query.scalar()
+
+
+def replica_lag(primary, replica):
+    """Seconds since the replica first missed a change made in the primary.
+
+    Changes are samples loaded (or reloaded) by Chanjo and stored panels.
+
+    Returns:
+        float: 0 if the replica is up to date
+    """
+    columns = [Sample.created_at]
+    if has_tables(primary, PANEL_TABLES):
+        columns.append(GenePanel.updated_at)
+    changes = [missing_since(primary, replica, column) for column in columns]
+    changes = [changed_at for changed_at in changes if changed_at is not None]
+    if not changes:
+        return 0
+    return max((datetime.now() - min(changes)).total_seconds(), 0)
+
+
+class ReplicaState(object):
+
+    """Replica of an app along with the outcome of the last check.
+
+    Args:
+        replica: ``ChanjoDB`` connected to the replica
+        max_lag (int): seconds the replica may fall behind
+        interval (int): seconds to reuse the outcome of a check
+    """
+
+    def __init__(self, replica, max_lag, interval):
+        self.replica = replica
+        self.max_lag = max_lag
+        self.interval = interval
+        self._usable = False
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def check(self, primary):
+        try:
+            lag = replica_lag(primary, self.replica)
+        except DBAPIError as error:
+            LOG.warning("replica unavailable, reading from the primary: %s", error)
+            return False
+        finally:
+            self.replica.session.remove()
+        if lag > self.max_lag:
+            LOG.warning("replica is %.0fs behind, reading from the primary", lag)
+            return False
+        return True
+
+    def usable(self, primary):
+        """Check if reads can go to the replica, at most once per interval."""
+        with self._lock:
+            now = time.time()
+            if self._checked_at is None or now - self._checked_at >= self.interval:
+                self._usable = self.check(primary)
+                self._checked_at = now
+            return self._usable
+
+    def mark_failed(self):
+        """Skip the replica until the next check."""
+        with self._lock:
+            self._usable = False
+            self._checked_at = time.time()
+
+
+class ReadReplica(object):
+
+    """Flask extension picking the database that report queries read from.
+
+    Args:
+        db: Flask extension of the main (primary) database
+        metrics (Optional[RequestMetrics]): times queries on the replica
+
+    Config:
+        CHANJO_REPLICA_URI (str): read-only replica of the main database
+        CHANJO_REPLICA_MAX_LAG (int): seconds the replica may miss changes
+            made in the primary before reads fail over to the primary
+        CHANJO_REPLICA_CHECK_INTERVAL (int): seconds between checks of the
+            replica
+    """
+
+    def __init__(self, db, metrics=None, app=None):
+        self.db = db
+        self.metrics = metrics
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        uri = app.config.get('CHANJO_REPLICA_URI')
+        state = None
+        if uri:
+            max_lag = app.config.get('CHANJO_REPLICA_MAX_LAG', 300)
+            interval = app.config.get('CHANJO_REPLICA_CHECK_INTERVAL', 10)
+            state = ReplicaState(connect(uri), max_lag=max_lag, interval=interval)
+            if self.metrics is not None:
+                self.metrics.instrument(state.replica.engine, app=app)
+            app.teardown_appcontext(self.remove_session)
+        app.extensions['chanjo_replica'] = state
+
+    @property
+    def state(self):
+        return current_app.extensions.get('chanjo_replica')
+
+    def remove_session(self, exception=None):
+        self.state.replica.session.remove()
+
+    def reader(self):
+        """Return the database API that report queries should read from."""
+        state = self.state
+        if state is None:
+            return self.db
+        reader = g.get('chanjo_reader')
+        if reader is None:
+            reader = state.replica if state.usable(self.db) else self.db
+            g.chanjo_reader = reader
+        return reader
+
+    def writer(self, reader):
+        """Return the database API to write to instead of a reader."""
+        state = self.state
+        if state is not None and reader is state.replica:
+            return self.db
+        return reader
+
+    def run(self, func, *args, **kwargs):
+        """Call a query function on the replica, failing over to the primary.
+
+        The function is called with the database API followed by the
+        arguments and must return fully loaded results.
+
+        Returns:
+            tuple: database API used and result
+        """
+        reader = self.reader()
+        if reader is self.db:
+            return self.db, func(self.db, *args, **kwargs)
+        try:
+            return reader, func(reader, *args, **kwargs)
+        except DBAPIError as error:
+            LOG.warning("replica query failed, reading from the primary: %s", error)
+            reader.session.remove()
+            self.state.mark_failed()
+            g.chanjo_reader = self.db
+            return self.db, func(self.db, *args, **kwargs)
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""Conditional and compressed responses.
+
+Responses built from data that only changes when samples are reloaded
+carry an ETag derived from the request parameters and sample load times.
+Clients that send it back get a ``304 Not Modified`` before any report
+query runs. Bodies are compressed with Brotli (if installed) or gzip for
+clients that accept it; the ETag is weak so that it covers all encodings.
+"""
+import gzip
+import io
+import os
+import zlib
+
+from flask import current_app, request, Response, send_file
+
+from .pdf import static_filename
+
+# bodies smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 500
+COMPRESS_MIMETYPES = {
+    'application/javascript',
+    'application/json',
+    'text/css',
+    'text/csv',
+    'text/html',
+    'text/plain',
+}
+# file extension of precompressed static files per encoding
+STATIC_EXTENSIONS = (('br', '.br'), ('gzip', '.gz'))
+
+_brotli = None
+
+
+def load_brotli():
+    """Import the Brotli encoder on first use, None if it isn't installed."""
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+        except ImportError:
+            _brotli = False
+        else:
+            _brotli = brotli
+    return _brotli or None
+
+
+def gzip_bytes(data, level=6):
+    """Compress bytes in the gzip format."""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=level) as handle:
+        handle.write(data)
+    return buffer.getvalue()
+
+
+def brotli_bytes(data, quality=5):
+    """Compress bytes in the Brotli format."""
+    return load_brotli().compress(data, quality=quality)
+
+
+ENCODERS = {'br': brotli_bytes, 'gzip': gzip_bytes}
+
+
+def gzip_stream(chunks, level=6):
+    """Compress a stream of text chunks in the gzip format.
+
+    Every chunk is flushed so that the client can render the page while
+    the rest is still being generated.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        if not isinstance(chunk, bytes):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def accepted_encoding(encodings=None):
+    """Pick the preferred encoding that the client accepts.
+
+    Returns:
+        Optional[str]: 'br', 'gzip' or None
+    """
+    if encodings is None:
+        encodings = ['br', 'gzip'] if load_brotli() else ['gzip']
+    return request.accept_encodings.best_match(encodings)
+
+
+def compress_response(response):
+    """Compress the body of a response if the client accepts it.
+
+    Streamed bodies are gzipped chunk by chunk, files sent from disk are
+    left alone.
+    """
+    if (response.direct_passthrough or response.status_code != 200 or
+            'Content-Encoding' in response.headers or
+            response.mimetype not in COMPRESS_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    if response.is_streamed:
+        if accepted_encoding(['gzip']) is None:
+            return response
+        response.response = gzip_stream(response.response)
+        response.headers.pop('Content-Length', None)
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
+
+    encoding = accepted_encoding()
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return response
+    response.set_data(ENCODERS[encoding](data))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def precompressed_response(response, filename):
+    """Replace a static file response with a precompressed copy, if any.
+
+    Looks for ``<file>.br`` and ``<file>.gz`` next to the file, see
+    :func:`precompress`.
+    """
+    encodings = [encoding for encoding, extension in STATIC_EXTENSIONS
+                 if os.path.isfile(filename + extension)]
+    encoding = accepted_encoding(encodings) if encodings else None
+    if encoding is None:
+        if encodings:
+            response.vary.add('Accept-Encoding')
+        return response
+
+    response.close()
+    compressed = send_file(filename + dict(STATIC_EXTENSIONS)[encoding],
+                           mimetype=response.mimetype, conditional=True)
+    compressed.headers['Content-Encoding'] = encoding
+    compressed.vary.add('Accept-Encoding')
+    compressed.cache_control.max_age = response.cache_control.max_age
+    return compressed
+
+
+def precompress(folder):
+    """Write compressed copies of the static files in a folder.
+
+    Files are only compressed again when they have changed.
+
+    Returns:
+        List[str]: paths of the written files
+    """
+    extensions = tuple(extension for _, extension in STATIC_EXTENSIONS)
+    options = {'br': dict(quality=11), 'gzip': dict(level=9)}
+    written = []
+    for root, _, filenames in os.walk(folder):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            if (filename.endswith(extensions) or
+                    os.path.getsize(path) < MIN_COMPRESS_SIZE):
+                continue
+            with open(path, 'rb') as handle:
+                data = None
+                for encoding, extension in STATIC_EXTENSIONS:
+                    target = path + extension
+                    if encoding == 'br' and not load_brotli():
+                        continue
+                    if (os.path.exists(target) and
+                            os.path.getmtime(target) >= os.path.getmtime(path)):
+                        continue
+                    if data is None:
+                        data = handle.read()
+                    with open(target, 'wb') as target_handle:
+                        target_handle.write(
+                            ENCODERS[encoding](data, **options[encoding]))
+                    written.append(target)
+    return written
+
+
+def set_validators(response, etag):
+    """Add the ETag and ask clients to revalidate before reusing the body."""
+    response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(etag):
+    """Return a 304 response if the client has the current version.
+
+    Returns:
+        Optional[Response]: None if the body needs to be sent
+    """
+    if request.if_none_match.contains_weak(etag):
+        return set_validators(Response(status=304), etag)
+    return None
+
+
+class Compression(object):
+
+    """Flask extension compressing responses for clients that accept it.
+
+    Text responses are compressed on the fly; static files are replaced
+    by precompressed copies when they exist.
+
+    Config:
+        CHANJO_COMPRESS (bool): compress responses
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if app.config.get('CHANJO_COMPRESS', True):
+            app.after_request(self.after_request)
+
+    def after_request(self, response):
+        endpoint = request.endpoint or ''
+        if endpoint == 'static' or endpoint.endswith('.static'):
+            if response.status_code != 200:
+                return response
+            filename = static_filename(current_app, request.path)
+            return (precompressed_response(response, filename) if filename
+                    else response)
+        return compress_response(response)
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Run the independent sections of a report concurrently.
+
+The sex prediction, key metrics and transcript counts of a report are
+separate sets of queries that don't depend on each other. They are
+started together in a small thread pool, each thread with an app context
+and thus a database session and pooled connection of its own, and the
+template waits for each result when it gets to that section. A report
+then takes about as long as its slowest section; a streamed report still
+sends the page header right away.
+
+The pool is shared by all requests of a process and by default has a
+thread for every section of every request the server handles at once
+(``CHANJO_SERVER_THREADS``), so that concurrent reports don't queue up
+behind each other. Each report then holds up to one database connection
+in the request thread plus one per section: keep ``SQLALCHEMY_POOL_SIZE``
+(plus ``SQLALCHEMY_MAX_OVERFLOW``) at no less than
+``CHANJO_SERVER_THREADS * (SECTIONS_PER_REPORT + 1)`` or section threads
+wait for a free connection.
+"""
+import logging
+import time
+
+from flask import current_app, g
+
+from .pools import LazyThreadPool
+
+LOG = logging.getLogger(__name__)
+
+# sex, key metrics and transcripts, see report/views.py
+SECTIONS_PER_REPORT = 3
+# SQLAlchemy default of connections opened beyond the pool size
+DEFAULT_MAX_OVERFLOW = 10
+
+# request globals that sections share with the request, e.g. to count
+# their queries towards it, read from the same database and fetch the
+# transcript stats of the NumPy engine once
+SHARED_GLOBALS = ('chanjo_stats', 'chanjo_reader', 'chanjo_frames')
+
+
+def call_section(app, name, func, shared):
+    """Run a report section in a worker thread."""
+    start = time.time()
+    with app.app_context():
+        for key, value in shared.items():
+            setattr(g, key, value)
+        try:
+            return func()
+        finally:
+            LOG.debug("ran section %s in %.3fs", name, time.time() - start)
+
+
+class Pending(object):
+
+    """Result of a section that is computed in a worker thread.
+
+    Iterating over it waits for the result.
+    """
+
+    def __init__(self, async_result):
+        self.async_result = async_result
+
+    def get(self):
+        return self.async_result.get()
+
+    def __iter__(self):
+        return iter(self.get())
+
+
+class Deferred(object):
+
+    """Result of a section that is computed in the calling thread on first use."""
+
+    def __init__(self, func):
+        self.func = func
+        self._done = False
+        self._result = None
+
+    def get(self):
+        if not self._done:
+            self._result = self.func()
+            self._done = True
+        return self._result
+
+    def __iter__(self):
+        return iter(self.get())
+
+
+class SectionsState(object):
+
+    """Thread pool of an app running report sections.
+
+    Args:
+        workers (int): number of threads, 0 to run sections one by one
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.pool = LazyThreadPool(workers)
+
+
+class ReportSections(object):
+
+    """Flask extension running report sections concurrently.
+
+    Config:
+        CHANJO_SECTION_WORKERS (int): threads running report sections; 0
+            runs each section when the template gets to it. Defaults to a
+            thread per section and server thread.
+        CHANJO_SERVER_THREADS (int): requests the server handles at once
+            in each process, e.g. the Gunicorn ``--threads``
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        threads = app.config.get('CHANJO_SERVER_THREADS') or 1
+        workers = app.config.get('CHANJO_SECTION_WORKERS')
+        if workers is None:
+            workers = SECTIONS_PER_REPORT * threads
+        app.extensions['chanjo_sections'] = SectionsState(workers)
+        self.check_pool_size(app, threads, workers)
+
+    @staticmethod
+    def check_pool_size(app, threads, workers):
+        """Warn if section threads would wait for database connections."""
+        pool_size = app.config.get('SQLALCHEMY_POOL_SIZE')
+        if pool_size is None or not workers:
+            return
+        max_overflow = app.config.get('SQLALCHEMY_MAX_OVERFLOW')
+        if max_overflow is None:
+            max_overflow = DEFAULT_MAX_OVERFLOW
+        needed = threads + min(workers, threads * SECTIONS_PER_REPORT)
+        if pool_size + max_overflow < needed:
+            LOG.warning("%s database connections for %s server threads and %s "
+                        "section workers, reports may need up to %s",
+                        pool_size + max_overflow, threads, workers, needed)
+
+    def run(self, sections):
+        """Start computing report sections.
+
+        Args:
+            sections (List[tuple]): name and function without arguments
+                returning the fully loaded result of each section
+
+        Returns:
+            dict: name -> :class:`Pending` (or :class:`Deferred`) result
+        """
+        state = current_app.extensions['chanjo_sections']
+        if not state.workers:
+            return {name: Deferred(func) for name, func in sections}
+
+        app = current_app._get_current_object()
+        shared = {key: g.get(key) for key in SHARED_GLOBALS if key in g}
+        return {name: Pending(state.pool.apply_async(
+                    call_section, (app, name, func, shared)))
+                for name, func in sections}
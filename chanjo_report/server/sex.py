@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Sex prediction from average coverage on the sex chromosomes.
+
+The coverage of a sample doesn't change once it's loaded, so the average
+X and Y coverage and the predicted sex are stored as :class:`SampleSex`
+rows: on first access by a report or in bulk by ``chanjo report
+summarize``. Reloading a sample in Chanjo makes its row outdated.
+"""
+import logging
+
+from chanjo.sex import predict_sex
+from chanjo.store.models import Sample, Transcript, TranscriptStat
+from sqlalchemy import and_, func
+from sqlalchemy.exc import SQLAlchemyError
+
+from .models import has_tables, SampleSex
+from .summary import stale_samples
+
+LOG = logging.getLogger(__name__)
+
+SEX_TABLES = (SampleSex.__table__,)
+
+
+def predict(api, sample_ids):
+    """Average coverage on X and Y and predict the sex of samples.
+
+    Samples without any transcripts on X or Y are left out.
+
+    Returns:
+        List[dict]: values of :class:`SampleSex` rows
+    """
+    query = (api.query(TranscriptStat.sample_id, Sample.created_at,
+                       Transcript.chromosome,
+                       func.avg(TranscriptStat.mean_coverage))
+                .join(Sample, Sample.id == TranscriptStat.sample_id)
+                .join(Transcript, Transcript.id == TranscriptStat.transcript_id)
+                .filter(Transcript.chromosome.in_(['X', 'Y']),
+                        TranscriptStat.sample_id.in_(sample_ids))
+                .group_by(TranscriptStat.sample_id, Sample.created_at,
+                          Transcript.chromosome))
+
+    samples = {}
+    for sample_id, created_at, chromosome, coverage in query:
+        record = samples.setdefault(sample_id, dict(
+            sample_id=sample_id, sample_created_at=created_at,
+            x_coverage=0, y_coverage=0))
+        record["{}_coverage".format(chromosome.lower())] = coverage
+
+    for record in samples.values():
+        record['sex'] = predict_sex(record['x_coverage'], record['y_coverage'])
+    return list(samples.values())
+
+
+def store(api, sample_ids, records):
+    """Replace stored predictions of samples."""
+    table = SampleSex.__table__
+    # use a separate transaction to leave objects in the session untouched
+    with api.engine.begin() as connection:
+        connection.execute(table.delete().where(table.c.sample_id.in_(sample_ids)))
+        if records:
+            connection.execute(table.insert(), records)
+
+
+def sample_sex(api, sample_ids, writer=None):
+    """Return the predicted sex of samples, reading stored predictions.
+
+    Predictions missing or outdated are computed and, if the table has
+    been set up, stored for the next time.
+
+    Args:
+        writer (Optional): database API to store predictions in, e.g. the
+            primary of a read-only replica; ``api`` by default
+
+    Returns:
+        dict: values of :class:`SampleSex` rows per sample id
+    """
+    if not sample_ids:
+        return {}
+    if not has_tables(api, SEX_TABLES):
+        return {record['sample_id']: record for record in predict(api, sample_ids)}
+
+    columns = [getattr(SampleSex, column.name) for column in SampleSex.__table__.c]
+    # samples of another database or unknown ids are left out
+    up_to_date = and_(SampleSex.sample_id == Sample.id,
+                      SampleSex.sample_created_at == Sample.created_at)
+    query = (api.query(Sample.id.label('id'), *columns)
+                .outerjoin(SampleSex, up_to_date)
+                .filter(Sample.id.in_(sample_ids)))
+    results = {}
+    missing = []
+    for row in query:
+        if row.sample_id is None:
+            missing.append(row.id)
+        else:
+            results[row.sample_id] = {column.name: getattr(row, column.name)
+                                      for column in SampleSex.__table__.c}
+
+    # samples without transcripts on X or Y aren't predicted at all
+    records = predict(api, missing) if missing else []
+    if records:
+        try:
+            store(writer or api, [record['sample_id'] for record in records],
+                  records)
+        except SQLAlchemyError as error:
+            # e.g. a read-only database user, we'll predict again next time
+            LOG.warning("unable to store sex predictions: %s", error)
+        results.update((record['sample_id'], record) for record in records)
+    return results
+
+
+def refresh_sex(api, sample_ids=None, force=False, batch_size=500):
+    """Predict the sex of samples that were added or reloaded since last run.
+
+    Args:
+        api: Chanjo database API (Flask extension or ``ChanjoDB``)
+        sample_ids (Optional[List[str]]): restrict the refresh to these samples
+        force (Optional[bool]): refresh samples even if they are up to date
+        batch_size (Optional[int]): number of samples per transaction
+
+    Returns:
+        List[str]: ids of refreshed samples
+    """
+    SampleSex.metadata.create_all(bind=api.engine, tables=SEX_TABLES)
+
+    if force:
+        query = api.query(Sample.id)
+        if sample_ids:
+            query = query.filter(Sample.id.in_(sample_ids))
+        refresh_ids = [row[0] for row in query]
+    else:
+        refresh_ids = stale_samples(api, sample_ids=sample_ids, model=SampleSex)
+
+    for index in range(0, len(refresh_ids), batch_size):
+        batch = refresh_ids[index:index + batch_size]
+        LOG.info("predicting sex for %s samples", len(batch))
+        store(api, batch, predict(api, batch))
+
+    return refresh_ids
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""Reports across several Chanjo databases.
+
+Chanjo databases can be sharded, e.g. by year or by sequencing site. The
+main database (``SQLALCHEMY_DATABASE_URI``) is then complemented by named
+stores in ``CHANJO_STORES``. Report queries are run on every database at
+once, the stores in a thread pool while the main database is queried in
+the request thread, and the per-sample results are merged. A report
+takes about as long as its slowest database instead of all of them in
+turn. A sample found in more than one database is read from the first,
+the main database before stores in order of name.
+"""
+from collections import OrderedDict
+import logging
+import time
+
+from chanjo.store.api import ChanjoDB
+from flask import current_app, g
+
+from .pools import LazyThreadPool
+
+LOG = logging.getLogger(__name__)
+
+
+def connect(uri):
+    """Connect to a store without binding the shared models to it."""
+    # with the default declarative base ChanjoDB would bind ``Model.query``
+    # of the chanjo models to its own session
+    return ChanjoDB(uri, base=None)
+
+
+def call_store(app, name, store, func, args, kwargs, stats):
+    """Run a query function on a store in a worker thread."""
+    start = time.time()
+    with app.app_context():
+        # count the queries of the store towards the request
+        g.chanjo_stats = stats
+        try:
+            return func(store, *args, **kwargs)
+        finally:
+            store.session.remove()
+            LOG.debug("queried store %s in %.3fs", name, time.time() - start)
+
+
+class StoresState(object):
+
+    """Stores of an app along with the thread pool querying them.
+
+    Args:
+        stores (OrderedDict): name -> ``ChanjoDB`` of every store
+        workers (int): number of threads querying stores
+    """
+
+    def __init__(self, stores, workers):
+        self.stores = stores
+        self.pool = LazyThreadPool(workers)
+
+
+class ChanjoStores(object):
+
+    """Flask extension querying more Chanjo databases along with the main one.
+
+    Args:
+        db: Flask extension of the main database
+        replica (Optional[ReadReplica]): routes queries of the main database
+        metrics (Optional[RequestMetrics]): times queries on the stores
+
+    Config:
+        CHANJO_STORES (dict): name -> URI of more Chanjo databases
+        CHANJO_STORES_WORKERS (int): threads querying the stores, one per
+            store by default
+    """
+
+    def __init__(self, db, replica=None, metrics=None, app=None):
+        self.db = db
+        self.replica = replica
+        self.metrics = metrics
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        uris = app.config.get('CHANJO_STORES') or {}
+        stores = OrderedDict((name, connect(uris[name])) for name in sorted(uris))
+        workers = app.config.get('CHANJO_STORES_WORKERS') or len(stores)
+        app.extensions['chanjo_stores'] = StoresState(stores, workers)
+        if self.metrics is not None:
+            for store in stores.values():
+                self.metrics.instrument(store.engine, app=app)
+        if stores:
+            app.teardown_appcontext(self.remove_sessions)
+
+    @property
+    def state(self):
+        return current_app.extensions['chanjo_stores']
+
+    @property
+    def enabled(self):
+        """Check if reports span more than the main database."""
+        return bool(self.state.stores)
+
+    @property
+    def stores(self):
+        """Return the stores by name, not including the main database."""
+        return self.state.stores
+
+    def remove_sessions(self, exception=None):
+        # sessions opened in the request thread, e.g. by lazy queries
+        for store in self.state.stores.values():
+            store.session.remove()
+
+    def fan_out(self, func, *args, **kwargs):
+        """Call a query function on the main database and every store at once.
+
+        The function is called with the database API followed by the
+        arguments. It runs in an app context of its own for the stores and
+        must return fully loaded results; the store session is closed as
+        soon as it returns.
+
+        Returns:
+            List[tuple]: database API and result, main database first
+        """
+        state = self.state
+        if not state.stores:
+            return [self.run_main(func, *args, **kwargs)]
+
+        app = current_app._get_current_object()
+        stats = g.get('chanjo_stats')
+        pending = [(store, state.pool.apply_async(
+            call_store, (app, name, store, func, args, kwargs, stats)))
+            for name, store in state.stores.items()]
+        results = [self.run_main(func, *args, **kwargs)]
+        results.extend((store, result.get()) for store, result in pending)
+        return results
+
+    def run_main(self, func, *args, **kwargs):
+        """Call a query function on the main database or its replica."""
+        if self.replica is None:
+            return self.db, func(self.db, *args, **kwargs)
+        return self.replica.run(func, *args, **kwargs)
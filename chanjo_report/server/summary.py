@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Materialized per-sample, per-gene coverage summary.
+
+Aggregating raw ``TranscriptStat`` rows on every request gets slow as the
+number of samples grows. :func:`refresh` rolls them up into
+:class:`GeneStat` rows once per loaded sample. Report queries read from
+the summary whenever all requested samples are included and up to date.
+"""
+import logging
+
+from chanjo.store.models import Sample, Transcript, TranscriptStat
+from sqlalchemy import case, func, or_
+
+from .constants import LEVELS
+from .models import GeneStat, has_tables, SummarizedSample
+
+LOG = logging.getLogger(__name__)
+
+SUMMARY_TABLES = (GeneStat.__table__, SummarizedSample.__table__)
+AVERAGE_FIELDS = ['mean_coverage'] + list(LEVELS.values())
+SUMMARY_COLUMNS = (['sample_id', 'gene_id', 'transcripts'] + AVERAGE_FIELDS +
+                   ["covered_{}".format(level) for level in LEVELS] +
+                   ["{}_count".format(field_id) for field_id in AVERAGE_FIELDS])
+
+
+def has_summary(api):
+    """Check if the summary tables exist in the connected database."""
+    return has_tables(api, SUMMARY_TABLES)
+
+
+def is_summarized(api, sample_ids):
+    """Check if all samples are included in an up to date summary."""
+    sample_ids = set(sample_ids)
+    if not sample_ids or not has_summary(api):
+        return False
+    up_to_date = (
+        api.query(func.count(SummarizedSample.sample_id))
+           .join(Sample, Sample.id == SummarizedSample.sample_id)
+           .filter(SummarizedSample.sample_id.in_(sample_ids),
+                   SummarizedSample.sample_created_at == Sample.created_at)
+           .scalar()
+    )
+    return up_to_date == len(sample_ids)
+
+
+def stale_samples(api, sample_ids=None, model=SummarizedSample):
+    """Return ids of samples that are missing or outdated in the summary.
+
+    Args:
+        model: report model keeping track of ``sample_created_at``
+    """
+    query = (api.query(Sample.id)
+                .outerjoin(model, model.sample_id == Sample.id)
+                .filter(or_(model.sample_id.is_(None),
+                            model.sample_created_at != Sample.created_at)))
+    if sample_ids:
+        query = query.filter(Sample.id.in_(sample_ids))
+    return [row[0] for row in query]
+
+
+def summary_query(api, sample_ids):
+    """Aggregate transcript stats per sample and gene."""
+    columns = [
+        TranscriptStat.sample_id,
+        Transcript.gene_id,
+        func.count(TranscriptStat.id),
+    ]
+    average_fields = [getattr(TranscriptStat, field_id)
+                      for field_id in AVERAGE_FIELDS]
+    columns.extend(func.avg(field) for field in average_fields)
+    # transcripts with unknown completeness don't count as missed in reports
+    columns.extend(func.sum(case([(field < 100, 0)], else_=1))
+                   for field in average_fields[1:])
+    # AVG skips NULL values, so do the averages across genes
+    columns.extend(func.count(field) for field in average_fields)
+    query = (api.query(*columns)
+                .join(TranscriptStat.transcript)
+                .filter(TranscriptStat.sample_id.in_(sample_ids))
+                .group_by(TranscriptStat.sample_id, Transcript.gene_id))
+    return query
+
+
+def refresh(api, sample_ids=None, force=False, batch_size=50):
+    """Summarize samples that were added or reloaded since the last run.
+
+    Args:
+        api: Chanjo database API (Flask extension or ``ChanjoDB``)
+        sample_ids (Optional[List[str]]): restrict the refresh to these samples
+        force (Optional[bool]): refresh samples even if they are up to date
+        batch_size (Optional[int]): number of samples per transaction
+
+    Returns:
+        List[str]: ids of refreshed samples
+    """
+    GeneStat.metadata.create_all(bind=api.engine, tables=SUMMARY_TABLES)
+
+    if force:
+        query = api.query(Sample.id)
+        if sample_ids:
+            query = query.filter(Sample.id.in_(sample_ids))
+        refresh_ids = [row[0] for row in query]
+    else:
+        refresh_ids = stale_samples(api, sample_ids=sample_ids)
+
+    for index in range(0, len(refresh_ids), batch_size):
+        batch = refresh_ids[index:index + batch_size]
+        LOG.info("summarizing %s samples", len(batch))
+        for model in (GeneStat, SummarizedSample):
+            (api.query(model).filter(model.sample_id.in_(batch))
+                             .delete(synchronize_session=False))
+
+        insert_stmt = GeneStat.__table__.insert().from_select(
+            SUMMARY_COLUMNS, summary_query(api, batch).statement)
+        api.session.execute(insert_stmt)
+
+        created_query = (api.query(Sample.id, Sample.created_at)
+                            .filter(Sample.id.in_(batch)))
+        for sample_id, created_at in created_query:
+            api.session.add(SummarizedSample(sample_id=sample_id,
+                                             sample_created_at=created_at))
+        api.session.commit()
+
+    return refresh_ids
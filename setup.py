@@ -55,7 +55,7 @@ setup(name='chanjo-report',
       license='MIT',
       # the project's main homepage
       url='https://github.com/robinandeer/chanjo-report',
-      packages=find_packages(exclude=('tests*', 'docs', 'examples')),
+      packages=find_packages(exclude=('tests*', 'benchmarks*', 'docs', 'examples')),
       # if there are data files included in your packages
       include_package_data=True,
       package_data={
@@ -77,12 +77,20 @@ setup(name='chanjo-report',
           'lxml>=3.0',
           'cffi',
           'Flask',
-          'SQLAlchemy',
+          'SQLAlchemy>=1.2',
           'Flask-Babel',
           'tabulate',
           'Flask-Alchy',
           'Flask-SQLAlchemy==2.1',
       ],
+      extras_require={
+          # production WSGI server for HTML reports
+          'server': ['gunicorn'],
+          # vectorized report aggregates for large cohorts
+          'numpy': ['numpy>=1.13'],
+          # Brotli compressed responses and static files
+          'brotli': ['brotli'],
+      },
       tests_require=['pytest'],
       cmdclass={'test': PyTest},
       # to provide executable scripts, use entry points
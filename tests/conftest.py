@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+from chanjo.store.models import Sample, Transcript, TranscriptStat
+import pytest
+
+from chanjo_report.server.app import create_app
+from chanjo_report.server.constants import LEVELS
+from chanjo_report.server.extensions import api
+
+
+def load_coverage(session, genes=5, samples=2):
+    """Add transcripts and coverage stats for a number of genes."""
+    transcripts = []
+    for gene_id in range(1, genes + 1):
+        for index in range(2):
+            chromosome = 'X' if gene_id % 2 else 'Y'
+            transcripts.append(Transcript(id="CCDS{}.{}".format(gene_id, index),
+                                          gene_id=gene_id,
+                                          gene_name="GENE{}".format(gene_id),
+                                          chromosome=chromosome, length=100))
+    session.add_all(transcripts)
+
+    for sample_index in range(samples):
+        sample_id = "sample{}".format(sample_index)
+        session.add(Sample(id=sample_id, group_id='group1',
+                           name="Sample {}".format(sample_index),
+                           created_at=datetime(2017, 1, 1 + sample_index)))
+        for tx_index, transcript in enumerate(transcripts):
+            completeness = 90.0 if tx_index % 3 == 0 else 100.0
+            session.add(TranscriptStat(
+                sample_id=sample_id, transcript_id=transcript.id,
+                mean_coverage=20.0 + tx_index, threshold=10,
+                completeness_10=completeness, completeness_15=completeness,
+                completeness_20=completeness, completeness_50=completeness - 10,
+                completeness_100=completeness - 20,
+                _incomplete_exons='X|10|20|80.0',
+            ))
+    session.commit()
+
+
+@pytest.fixture
+def make_app(tmpdir):
+    """Return a factory for report apps on a fresh coverage database."""
+    def factory(genes=5, samples=2, **config):
+        class TestConfig(object):
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = "sqlite:///{}".format(
+                tmpdir.join("coverage-{}-{}.sqlite".format(genes, samples)))
+            SQLALCHEMY_TRACK_MODIFICATIONS = False
+            CHANJO_CACHE = None
+
+        for key, value in config.items():
+            setattr(TestConfig, key, value)
+        app = create_app(config=TestConfig)
+        with app.app_context():
+            api.Model.metadata.create_all(bind=api.engine)
+            load_coverage(api.session, genes=genes, samples=samples)
+            api.session.remove()
+        return app
+    return factory
+
+
+@pytest.fixture
+def cohort(make_app):
+    """App on a database where samples differ and some values are NULL."""
+    app = make_app(genes=6, samples=4)
+    with app.app_context():
+        stats = TranscriptStat.query.order_by(TranscriptStat.id).all()
+        for index, stat in enumerate(stats):
+            stat.mean_coverage += index % 7
+            if index % 5 == 0:
+                stat.completeness_20 = 75.0 + index % 4
+            if index % 11 == 0:
+                stat.completeness_50 = None
+        api.session.commit()
+        api.session.remove()
+    return app
+
+
+def metrics_values(rows):
+    """Compare key metrics rows as plain tuples."""
+    return [(row.Sample.id, row.mean_coverage) +
+            tuple(getattr(row, field_id) for field_id in LEVELS.values())
+            for row in rows]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""Rendering PDF reports in a pool of processes."""
+from chanjo_report.interfaces import pdf
+
+
+def fake_write_report(app, sample_ids, target=None, **params):
+    if not sample_ids:
+        raise ValueError('no samples')
+    with open(target, 'w') as handle:
+        handle.write(','.join(sample_ids))
+
+
+def test_failing_report_keeps_batch_going(monkeypatch, tmpdir):
+    # worker processes are forked and inherit the patches
+    monkeypatch.setattr(pdf, 'configure_app', lambda options: None)
+    monkeypatch.setattr(pdf, 'write_report', fake_write_report)
+    jobs = [(name, sample_ids, {}, str(tmpdir.join(name + '.pdf')))
+            for name, sample_ids in [('first', ['sample0']), ('empty', []),
+                                     ('last', ['sample1'])]]
+    results = {name: error for name, _, error
+               in pdf.render_batch({}, jobs, processes=2)}
+    assert results['first'] is None and results['last'] is None
+    assert results['empty'] == 'ValueError: no samples'
+    assert tmpdir.join('last.pdf').read() == 'sample1'
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Report cache backends and keys."""
+from datetime import datetime
+
+from chanjo.store.models import Sample
+
+from chanjo_report.server import cache
+from chanjo_report.server.blueprints.report.views import (
+    report_cache_key, report_options)
+from chanjo_report.server.cache import FileSystemCache, LRUCache, make_key
+from chanjo_report.server.extensions import api
+
+
+def request_key(app, query_string):
+    with app.test_request_context('/report?' + query_string):
+        sample_ids, extras = report_options()
+        key = report_cache_key('html', sample_ids, extras)
+        api.session.remove()
+    return key
+
+
+def test_make_key_ignores_param_order():
+    assert make_key('html', level=10, genes=[1]) == make_key('html', genes=[1], level=10)
+    assert make_key('html', level=10) != make_key('pdf', level=10)
+
+
+def test_report_key_ignores_order(make_app):
+    app = make_app()
+    key = request_key(app, 'sample_id=sample0&sample_id=sample1&gene_ids=1,2')
+    assert key == request_key(app, 'sample_id=sample1&sample_id=sample0&gene_ids=2,1')
+    assert key != request_key(app, 'sample_id=sample0&gene_ids=1,2')
+
+
+def test_report_key_changes_on_reload(make_app):
+    app = make_app()
+    query_string = 'sample_id=sample0&sample_id=sample1'
+    key = request_key(app, query_string)
+    with app.app_context():
+        Sample.query.get('sample1').created_at = datetime(2018, 1, 1)
+        api.session.commit()
+        api.session.remove()
+    assert request_key(app, query_string) != key
+
+
+def test_lru_cache_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'time', lambda: now[0])
+    lru_cache = LRUCache(timeout=60)
+    lru_cache.set('key', 'value')
+    now[0] += 59
+    assert lru_cache.get('key') == 'value'
+    now[0] += 2
+    assert lru_cache.get('key') is None
+
+
+def test_lru_cache_evicts_least_recently_used():
+    lru_cache = LRUCache(maxsize=2, timeout=0)
+    lru_cache.set('first', 1)
+    lru_cache.set('second', 2)
+    # reading marks the entry as recently used
+    assert lru_cache.get('first') == 1
+    lru_cache.set('third', 3)
+    assert lru_cache.get('second') is None
+    assert lru_cache.get('first') == 1
+    assert lru_cache.get('third') == 3
+
+
+def test_filesystem_cache_survives_restart(tmpdir):
+    directory = str(tmpdir.join('cache'))
+    FileSystemCache(directory).set('key', b'<html>')
+    assert FileSystemCache(directory).get('key') == b'<html>'
+    FileSystemCache(directory).clear()
+    assert FileSystemCache(directory).get('key') is None
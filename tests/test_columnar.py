@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Cross-check the NumPy engine against the SQL queries."""
+import pytest
+
+from chanjo_report.server import columnar
+from chanjo_report.server.blueprints.report.utils import (
+    diagnostic_yield, keymetrics_rows, transcript_counts)
+from chanjo_report.server.constants import LEVELS
+from chanjo_report.server.extensions import api
+
+from conftest import metrics_values
+
+pytest.importorskip('numpy')
+
+SAMPLE_IDS = ['sample0', 'sample1', 'sample2', 'sample3']
+
+
+def compare_engines(app, func):
+    results = []
+    for engine in ('sql', 'numpy'):
+        app.config['CHANJO_ENGINE'] = engine
+        with app.test_request_context():
+            results.append(func())
+            api.session.remove()
+    return results
+
+
+@pytest.mark.parametrize('genes', [None, [1, 2, 5]])
+def test_keymetrics_rows(cohort, genes):
+    sql_rows, numpy_rows = compare_engines(
+        cohort, lambda: metrics_values(keymetrics_rows(SAMPLE_IDS, genes=genes)))
+    assert len(numpy_rows) == len(SAMPLE_IDS)
+    assert sorted(sql_rows) == pytest.approx(numpy_rows)
+
+
+@pytest.mark.parametrize('genes', [None, [1, 2, 5]])
+def test_transcript_counts(cohort, genes):
+    sql_counts, numpy_counts = compare_engines(
+        cohort, lambda: {sample_id: tuple(row[1:]) for sample_id, row
+                         in transcript_counts(SAMPLE_IDS, genes=genes).items()})
+    assert sql_counts == numpy_counts
+
+
+@pytest.mark.parametrize('level', list(LEVELS))
+@pytest.mark.parametrize('options', [
+    dict(),
+    dict(genes=[2, 3, 4]),
+    dict(samples=['sample1', 'sample3']),
+    dict(group='group1', genes=[6]),
+])
+def test_diagnostic_yield(cohort, level, options):
+    sql_results, numpy_results = compare_engines(
+        cohort, lambda: list(diagnostic_yield(api, level=level, **options)))
+    assert sql_results == numpy_results
+
+
+def test_unfiltered_diagnostic_yield_skips_frame(cohort, monkeypatch):
+    def load(*args, **kwargs):
+        raise AssertionError('loaded all transcript stats')
+
+    monkeypatch.setattr(columnar.CoverageFrame, 'load', load)
+    cohort.config['CHANJO_ENGINE'] = 'numpy'
+    with cohort.test_request_context():
+        assert len(list(diagnostic_yield(api))) == len(SAMPLE_IDS)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""Keyset pagination of the genes overview."""
+import pytest
+
+from chanjo_report.server.blueprints.report.utils import encode_cursor
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-a-cursor',
+    encode_cursor([90.0, 'CCDS1.0']),
+    encode_cursor([]),
+])
+def test_invalid_cursor(make_app, cursor):
+    client = make_app().test_client()
+    response = client.get('/genes', query_string={'after': cursor})
+    assert response.status_code == 400
+
+
+def test_page_links_keep_options(make_app):
+    client = make_app(genes=10).test_client()
+    response = client.get('/genes?limit=2&total=1&exonlink=mylink')
+    page = response.get_data(as_text=True)
+    links = [line for line in page.splitlines() if 'after=' in line]
+    assert links
+    assert all('total=1' in link and 'exonlink=mylink' in link for link in links)
+
+
+@pytest.mark.parametrize('url', [
+    '/genes?level=abc',
+    '/genes?level=30',
+    '/genes?limit=x',
+    '/genes?limit=0',
+    '/report?sample_id=sample0&level=30',
+    '/report?sample_id=sample0&gene_ids=1,BRCA1',
+])
+def test_invalid_options(make_app, url):
+    response = make_app().test_client().get(url)
+    assert response.status_code == 400
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import gzip
+import io
+import json
+
+import pytest
+
+URL = '/api/v1/heatmap?group=group1&gene_ids=1,2,3,99'
+
+
+def test_heatmap_matrix(make_app):
+    app = make_app(genes=3, samples=2)
+    response = app.test_client().get(URL)
+    assert response.status_code == 200
+    data = json.loads(response.get_data(as_text=True))
+    assert data['samples'] == ['sample0', 'sample1']
+    assert data['genes'] == [1, 2, 3]
+    # transcripts 0 and 3 (genes 1 and 2) are 90% complete
+    assert data['values'] == [[95.0, 95.0], [95.0, 95.0], [100.0, 100.0]]
+
+
+def test_heatmap_conditional_gzip(make_app):
+    client = make_app(genes=20, samples=3).test_client()
+    gene_ids = ','.join(str(gene_id) for gene_id in range(1, 21))
+    url = "/api/v1/heatmap?group=group1&gene_ids={}".format(gene_ids)
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    body = gzip.GzipFile(fileobj=io.BytesIO(response.data)).read()
+    data = json.loads(body.decode('utf-8'))
+    assert len(data['values']) == 20
+
+    etag = response.headers['ETag']
+    cached = client.get(url, headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+    other_level = client.get(url + '&level=20', headers={'If-None-Match': etag})
+    assert other_level.status_code == 200
+
+
+def test_heatmap_requires_genes(make_app):
+    response = make_app().test_client().get('/api/v1/heatmap?group=group1')
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('url', [
+    '/heatmap?group=group1&gene_ids=1&level=abc',
+    '/heatmap?group=group1&gene_ids=1&level=30',
+    '/diagnostic-yield?level=abc',
+    '/diagnostic-yield?gene_ids=1,BRCA1',
+])
+def test_invalid_options(make_app, url):
+    response = make_app().test_client().get(url)
+    assert response.status_code == 400
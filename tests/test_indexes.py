@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Indexes for the report queries."""
+from click.testing import CliRunner
+
+from chanjo_report.cli.db import db
+from chanjo_report.server.extensions import api
+from chanjo_report.server.indexes import (create_indexes, missing_indexes,
+                                          REPORT_INDEXES)
+
+
+def test_missing_indexes(make_app):
+    app = make_app()
+    with app.app_context():
+        engine = api.engine
+    missing = missing_indexes(engine)
+    assert [name for name, _, _ in missing] == [name for name, _, _ in REPORT_INDEXES]
+    assert len(missing_indexes(engine, levels=[10])) == 3
+
+    create_indexes(engine, missing)
+    assert missing_indexes(engine) == []
+
+
+def test_optimize_command(make_app):
+    app = make_app()
+    runner = CliRunner()
+    options = {'database': app.config['SQLALCHEMY_DATABASE_URI']}
+    result = runner.invoke(db, ['optimize', '--dry-run'], obj=dict(options))
+    assert result.exit_code == 0
+    assert 'missing index: ix_report_transcript_chromosome' in result.output
+
+    result = runner.invoke(db, ['optimize', '--repeat', '1'], obj=dict(options))
+    assert result.exit_code == 0
+    result = runner.invoke(db, ['optimize', '--dry-run'], obj=dict(options))
+    assert 'all report indexes are in place' in result.output
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+
+from chanjo_report.server.jobs import DONE, FAILED, LocalJobs, QUEUED, RUNNING
+
+
+def wait_for(jobs, job_id):
+    jobs.pool.close()
+    jobs.pool.join()
+    return jobs.status(job_id)
+
+
+def test_submit_deduplicates(tmpdir):
+    jobs = LocalJobs(str(tmpdir))
+    calls = []
+    started = threading.Event()
+
+    def render(target):
+        started.wait(5)
+        calls.append(target)
+        with open(target, 'w') as handle:
+            handle.write('report')
+
+    first = jobs.submit('job1', render)
+    second = jobs.submit('job1', render)
+    started.set()
+    assert first['id'] == second['id'] == 'job1'
+
+    state = wait_for(jobs, 'job1')
+    assert state['status'] == DONE
+    assert len(calls) == 1
+    assert tmpdir.join('job1.result').read() == 'report'
+
+
+def test_failed_job(tmpdir):
+    jobs = LocalJobs(str(tmpdir))
+
+    def render(target):
+        raise ValueError('no samples')
+
+    jobs.submit('job2', render)
+    state = wait_for(jobs, 'job2')
+    assert state['status'] == FAILED
+    assert state['error'] == 'no samples'
+
+
+def test_stalled_job_restarts(tmpdir):
+    jobs = LocalJobs(str(tmpdir), stall_timeout=60)
+    # left behind by a worker process that was killed while rendering
+    jobs._update('job3', status=RUNNING)
+    long_ago = time.time() - 120
+    os.utime(str(tmpdir.join('job3.json')), (long_ago, long_ago))
+    assert jobs.status('job3')['status'] == FAILED
+
+    def render(target):
+        with open(target, 'w') as handle:
+            handle.write('report')
+
+    assert jobs.submit('job3', render)['status'] == QUEUED
+    assert wait_for(jobs, 'job3')['status'] == DONE
+
+
+def test_heartbeat_keeps_job_alive(tmpdir):
+    jobs = LocalJobs(str(tmpdir), stall_timeout=0.2)
+    finish = threading.Event()
+
+    def render(target):
+        finish.wait(5)
+        with open(target, 'w') as handle:
+            handle.write('report')
+
+    jobs.submit('job4', render)
+    time.sleep(0.5)
+    assert jobs.status('job4')['status'] == RUNNING
+    finish.set()
+    assert wait_for(jobs, 'job4')['status'] == DONE
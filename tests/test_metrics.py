@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+
+
+def test_server_timing(make_app):
+    app = make_app()
+    response = app.test_client().get('/genes/1?sample_id=sample0')
+    timing = response.headers['Server-Timing']
+    assert 'db;dur=' in timing
+    assert 'desc="3 queries"' in timing
+
+
+def test_metrics_endpoint(make_app):
+    app = make_app(CHANJO_METRICS=True)
+    client = app.test_client()
+    client.get('/genes/1?sample_id=sample0')
+    response = client.get('/metrics')
+    data = response.get_data(as_text=True)
+    assert 'chanjo_request_queries_count{endpoint="report.gene"} 1' in data
+    assert 'chanjo_request_queries_bucket{endpoint="report.gene",le="5"} 1' in data
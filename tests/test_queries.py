@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Make sure pages cost a fixed number of queries whatever their size and
+that stored panels filter reports like the gene ids they contain.
+"""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from chanjo_report.server.blueprints.report.views import (
+    report_cache_key, report_options)
+from chanjo_report.server.extensions import api
+from chanjo_report.server.panels import save_panel
+
+
+@contextmanager
+def count_queries(app):
+    """Count SQL statements executed by the app's database engine."""
+    statements = []
+
+    def before_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = api.engine
+    event.listen(engine, 'before_cursor_execute', before_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_execute)
+
+
+def page_queries(app, url):
+    with count_queries(app) as statements:
+        response = app.test_client().get(url)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize('url', [
+    '/genes/1?sample_id=sample0&sample_id=sample1',
+    '/genes?sample_id=sample0&sample_id=sample1&limit=100',
+    '/report?sample_id=sample0&sample_id=sample1&show_genes=yes',
+])
+def test_query_budget(make_app, url):
+    small_app = make_app(genes=2)
+    large_app = make_app(genes=20)
+    assert page_queries(large_app, url) == page_queries(small_app, url)
+
+
+def test_gene_query_budget(make_app):
+    app = make_app(genes=10)
+    # gene name, samples and transcript stats
+    assert page_queries(app, '/genes/1?sample_id=sample0') == 3
+
+
+def report_page(app, query_string):
+    response = app.test_client().get('/report?' + query_string)
+    assert response.status_code == 200
+    # leave out the options form, it shows the parameters as given
+    return [line for line in response.get_data(as_text=True).splitlines()
+            if '<input' not in line]
+
+
+def test_panel_report_matches_gene_ids(make_app):
+    app = make_app(genes=6)
+    with app.app_context():
+        save_panel(api, 'panel1', [1, 2, 5], name='Panel 1')
+    options = 'sample_id=sample0&sample_id=sample1&show_genes=yes&panel_name=Panel 1'
+    panel_page = report_page(app, options + '&panel_id=panel1')
+    assert panel_page == report_page(app, options + '&gene_ids=1,2,5')
+    assert panel_page != report_page(app, options)
+
+
+def test_panel_update_changes_cache_key(make_app):
+    app = make_app(genes=6)
+
+    def cache_key():
+        with app.test_request_context('/report?sample_id=sample0&panel_id=panel1'):
+            sample_ids, extras = report_options()
+            key = report_cache_key('html', sample_ids, extras)
+            api.session.remove()
+        return key
+
+    with app.app_context():
+        save_panel(api, 'panel1', [1, 2, 5])
+        key = cache_key()
+        save_panel(api, 'panel1', [1, 2, 5])
+    assert cache_key() != key
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Report queries on a read-only replica with failover to the primary."""
+from datetime import datetime, timedelta
+import json
+import shutil
+
+import pytest
+
+from chanjo.store.models import Sample, TranscriptStat
+
+from chanjo_report.server.extensions import api
+from chanjo_report.server.models import SampleSex
+from chanjo_report.server.sex import SEX_TABLES
+from chanjo_report.server.stores import connect
+
+
+@pytest.fixture
+def replica_app(make_app, tmpdir):
+    """Return a factory for report apps reading from a copy of the primary."""
+    def factory(**config):
+        uri = "sqlite:///{}".format(tmpdir.join('replica.sqlite'))
+        app = make_app(CHANJO_REPLICA_URI=uri, **config)
+        primary_path = app.config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):]
+        shutil.copy(primary_path, str(tmpdir.join('replica.sqlite')))
+        return app
+    return factory
+
+
+def mean_coverages(app):
+    response = app.test_client().post(
+        '/api/v1/report', data=json.dumps(dict(sample_ids=['sample0'])),
+        content_type='application/json')
+    return [row['mean_coverage'] for row in json.loads(response.data)['metrics']]
+
+
+def add_sample(app, sample_id, created_at):
+    with app.app_context():
+        api.session.add(Sample(id=sample_id, created_at=created_at))
+        api.session.commit()
+        api.session.remove()
+
+
+def test_replica_failover(replica_app):
+    app = replica_app(CHANJO_REPLICA_CHECK_INTERVAL=0, CHANJO_REPLICA_MAX_LAG=300)
+    replica = connect(app.config['CHANJO_REPLICA_URI'])
+    replica.query(TranscriptStat).update({'mean_coverage': 1.0})
+    replica.session.commit()
+    replica.session.remove()
+
+    # reads go to the replica
+    assert mean_coverages(app) == [1.0]
+    # a sample just loaded into the primary is within the tolerance
+    add_sample(app, 'recent', datetime.now())
+    assert mean_coverages(app) == [1.0]
+    # the replica missing a sample loaded long ago is too stale
+    add_sample(app, 'older', datetime.now() - timedelta(hours=1))
+    assert mean_coverages(app) != [1.0]
+
+
+def test_replica_unavailable(make_app, tmpdir):
+    uri = "sqlite:///{}".format(tmpdir.join('missing', 'replica.sqlite'))
+    app = make_app(CHANJO_REPLICA_URI=uri)
+    assert mean_coverages(app) == mean_coverages(make_app(samples=3))
+    assert app.test_client().get('/genes/1').status_code == 200
+
+
+def test_replica_etag(replica_app):
+    app = replica_app(CHANJO_REPLICA_CHECK_INTERVAL=0)
+    client = app.test_client()
+    url = '/report?sample_id=sample0'
+    etag = client.get(url).headers['ETag']
+
+    # the page is still read from the replica which hasn't got the reload
+    with app.app_context():
+        Sample.query.get('sample0').created_at = datetime.now()
+        api.session.commit()
+        api.session.remove()
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    # reads go to the primary once the replica is too far behind
+    add_sample(app, 'older', datetime.now() - timedelta(hours=1))
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_sex_stored_in_primary(replica_app):
+    app = replica_app()
+    uri = app.config['CHANJO_REPLICA_URI']
+    with app.app_context():
+        SampleSex.metadata.create_all(bind=api.engine, tables=SEX_TABLES)
+    SampleSex.metadata.create_all(bind=connect(uri).engine, tables=SEX_TABLES)
+
+    response = app.test_client().get('/report?sample_id=sample0')
+    assert response.status_code == 200
+    with app.app_context():
+        assert [row.sample_id for row in SampleSex.query] == ['sample0']
+    assert connect(uri).query(SampleSex).count() == 0
+
+
+def test_replica_queries_timed(replica_app):
+    client = replica_app().test_client()
+    client.get('/genes/1?sample_id=sample0')
+    # replica checked by the first request
+    response = client.get('/genes/1?sample_id=sample0')
+    assert 'desc="3 queries"' in response.headers['Server-Timing']
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Conditional GET and compression of report pages."""
+from datetime import datetime
+import gzip
+import io
+
+from chanjo.store.models import Sample
+import pytest
+
+from chanjo_report.server.blueprints.report import views
+from chanjo_report.server.extensions import api
+from chanjo_report.server.responses import precompress
+
+REPORT_URL = '/report?sample_id=sample0&sample_id=sample1'
+
+
+def test_report_not_modified(make_app, monkeypatch):
+    app = make_app()
+    client = app.test_client()
+    response = client.get(REPORT_URL)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    def fail(*args, **kwargs):
+        raise AssertionError('report rendered again')
+
+    monkeypatch.setattr(views, 'render_report', fail)
+    cached = client.get(REPORT_URL, headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == etag
+
+    # reloading one of the samples changes the ETag
+    with app.app_context():
+        api.query(Sample).get('sample1').created_at = datetime(2018, 1, 1)
+        api.session.commit()
+        api.session.remove()
+    monkeypatch.undo()
+    reloaded = client.get(REPORT_URL, headers={'If-None-Match': etag})
+    assert reloaded.status_code == 200
+    assert reloaded.headers['ETag'] != etag
+
+
+@pytest.mark.parametrize('url', ['/genes?level=10', '/genes/1?sample_id=sample0'])
+def test_gene_pages_not_modified(make_app, url):
+    client = make_app().test_client()
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    other_url = url + '&limit=5'
+    assert client.get(other_url, headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_report_gzip(make_app):
+    client = make_app().test_client()
+    response = client.get(REPORT_URL, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    html = gzip.GzipFile(fileobj=io.BytesIO(response.data)).read()
+    assert b'sample1' in html
+
+    streamed = client.get(REPORT_URL + '&stream=1',
+                          headers={'Accept-Encoding': 'gzip'})
+    assert streamed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.GzipFile(fileobj=io.BytesIO(streamed.data)).read() == html
+
+    plain = client.get(REPORT_URL)
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.data == html
+
+
+def test_report_brotli(make_app):
+    brotli = pytest.importorskip('brotli')
+    client = make_app().test_client()
+    response = client.get(REPORT_URL, headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert b'sample1' in brotli.decompress(response.data)
+
+
+def test_compression_disabled(make_app):
+    client = make_app(CHANJO_COMPRESS=False).test_client()
+    response = client.get(REPORT_URL, headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_precompressed_static(make_app, monkeypatch, tmpdir):
+    stylesheet = tmpdir.mkdir('static').join('main.css')
+    stylesheet.write('body { color: black; }\n' * 100)
+    assert precompress(str(stylesheet.dirpath())) != []
+    assert precompress(str(stylesheet.dirpath())) == []
+    monkeypatch.setattr(views.report_bp, 'static_folder', str(stylesheet.dirpath()))
+
+    client = make_app().test_client()
+    response = client.get('/static/report/main.css',
+                          headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'text/css'
+    body = gzip.GzipFile(fileobj=io.BytesIO(response.data)).read()
+    assert body == stylesheet.read_binary()
+    response.close()
+
+    plain = client.get('/static/report/main.css')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.data == stylesheet.read_binary()
+    plain.close()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""Report sections queried concurrently render the same report."""
+import pytest
+
+from chanjo_report.server.columnar import CoverageFrame
+
+URL = '/report?sample_id=sample0&sample_id=sample1&sample_id=sample2&show_genes=yes'
+
+
+@pytest.mark.parametrize('stream', ['', '&stream=1'])
+def test_concurrent_sections(make_app, stream):
+    app = make_app(samples=3)
+    client = app.test_client()
+    concurrent = client.get(URL + stream)
+    assert concurrent.status_code == 200
+    html = concurrent.data
+    assert b'Sample 2' in html
+
+    app.extensions['chanjo_sections'].workers = 0
+    assert client.get(URL + stream).data == html
+
+
+def test_sections_share_frame(make_app, monkeypatch):
+    pytest.importorskip('numpy')
+    app = make_app(samples=3, CHANJO_ENGINE='numpy')
+    loads = []
+    load = CoverageFrame.load.__func__
+
+    def counting_load(cls, *args, **kwargs):
+        loads.append(args[1])
+        return load(cls, *args, **kwargs)
+
+    monkeypatch.setattr(CoverageFrame, 'load', classmethod(counting_load))
+    assert app.test_client().get(URL).status_code == 200
+    assert len(loads) == 1
+
+
+def test_workers_per_server_thread(make_app, caplog):
+    assert make_app().extensions['chanjo_sections'].workers == 3
+    app = make_app(samples=3, CHANJO_SERVER_THREADS=2, SQLALCHEMY_POOL_SIZE=8)
+    assert app.extensions['chanjo_sections'].workers == 6
+    assert 'database connections' not in caplog.text
+
+    make_app(samples=4, CHANJO_SERVER_THREADS=4, SQLALCHEMY_POOL_SIZE=5,
+             SQLALCHEMY_MAX_OVERFLOW=0)
+    assert 'reports may need up to 16' in caplog.text
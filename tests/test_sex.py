@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""Sex prediction from coverage on the sex chromosomes."""
+from sqlalchemy import event
+
+from chanjo_report.server.blueprints.report.utils import samplesex_rows
+from chanjo_report.server.extensions import api
+from chanjo_report.server.models import SampleSex
+from chanjo_report.server.sex import SEX_TABLES
+
+
+def test_sample_without_y_transcripts(make_app):
+    # a single gene puts all transcripts on chromosome X
+    app = make_app(genes=1)
+    with app.test_request_context():
+        rows = list(samplesex_rows(['sample0', 'sample1']))
+    assert [row['sample_id'] for row in rows] == ['sample0', 'sample1']
+    assert all(row['y_coverage'] == 0 for row in rows)
+    assert all(row['x_coverage'] > 0 for row in rows)
+
+    response = app.test_client().get('/report?sample_id=sample0')
+    assert response.status_code == 200
+
+
+def test_stored_predictions_not_rewritten(make_app):
+    app = make_app(genes=1)
+    with app.app_context():
+        SampleSex.metadata.create_all(bind=api.engine, tables=SEX_TABLES)
+        engine = api.engine
+    writes = []
+
+    def before_execute(conn, cursor, statement, *args):
+        if not statement.lstrip().upper().startswith(('SELECT', 'PRAGMA')):
+            writes.append(statement)
+
+    client = app.test_client()
+    url = '/report?sample_id=sample0&sample_id=unknown'
+    assert client.get(url).status_code == 200
+    with app.app_context():
+        assert [row.sample_id for row in SampleSex.query] == ['sample0']
+
+    event.listen(engine, 'before_cursor_execute', before_execute)
+    try:
+        assert client.get(url).status_code == 200
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_execute)
+    assert writes == []
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Make sure heavy dependencies are only imported when they are needed."""
+import json
+import subprocess
+import sys
+
+
+def imported_modules(code):
+    """Run code in a fresh interpreter and list the top level modules it imported."""
+    script = code + "\nimport sys, json\nprint(json.dumps(sorted(sys.modules)))"
+    output = subprocess.check_output([sys.executable, '-c', script])
+    modules = json.loads(output.decode('utf-8').splitlines()[-1])
+    return set(module.split('.')[0] for module in modules)
+
+
+def test_cli_import_is_light():
+    modules = imported_modules('import chanjo_report.cli')
+    assert not modules & {'flask', 'sqlalchemy', 'chanjo', 'weasyprint',
+                          'numpy', 'pkg_resources'}
+
+
+def test_html_and_api_skip_weasyprint(tmpdir):
+    uri = "sqlite:///{}".format(tmpdir.join('empty.sqlite'))
+    modules = imported_modules("""
+from chanjo_report.server.app import create_app
+from chanjo_report.server.extensions import api
+class Config(object):
+    SQLALCHEMY_DATABASE_URI = {!r}
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+app = create_app(config=Config)
+with app.app_context():
+    api.Model.metadata.create_all(bind=api.engine)
+client = app.test_client()
+assert client.get('/report').status_code == 200
+assert client.get('/api/v1/report?sample_id=unknown').status_code == 200
+""".format(uri))
+    assert 'weasyprint' not in modules
+    assert 'flask_weasyprint' not in modules
+    assert 'numpy' not in modules
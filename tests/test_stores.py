@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Reports across the main database and more Chanjo stores."""
+from datetime import datetime
+import json
+import re
+
+from chanjo.store.models import BASE, Sample
+
+from chanjo_report.server.blueprints.report import utils
+from chanjo_report.server.extensions import api
+from chanjo_report.server.stores import connect
+from chanjo_report.server.summary import refresh
+
+from conftest import load_coverage
+
+SAMPLE_IDS = ['sample0', 'sample1', 'sample2', 'sample3']
+
+
+def make_store(uri, sample_ids):
+    """Fill a store with all samples and drop those not listed."""
+    store = connect(uri)
+    BASE.metadata.create_all(bind=store.engine)
+    load_coverage(store.session, samples=len(SAMPLE_IDS))
+    for sample_obj in store.query(Sample).filter(~Sample.id.in_(sample_ids)):
+        store.session.delete(sample_obj)
+    store.session.commit()
+    store.session.remove()
+    return store
+
+
+def export(app, **data):
+    response = app.test_client().post('/api/v1/report', data=json.dumps(data),
+                                      content_type='application/json')
+    assert response.status_code == 200
+    return json.loads(response.get_data(as_text=True))
+
+
+def test_report_across_stores(make_app, tmpdir):
+    uri = "sqlite:///{}".format(tmpdir.join('shard.sqlite'))
+    make_store(uri, ['sample2', 'sample3'])
+    federated = make_app(samples=2, CHANJO_STORES={'shard': uri})
+    single = make_app(samples=4)
+
+    for options in [dict(), dict(gene_ids=[1, 2], level=20)]:
+        expected = export(single, sample_ids=SAMPLE_IDS, **options)
+        merged = export(federated, sample_ids=SAMPLE_IDS, **options)
+        assert [row['sample_id'] for row in merged['metrics']] == SAMPLE_IDS
+        assert merged == expected
+
+    with federated.test_request_context():
+        assert api.query(Sample).count() == 2
+
+    page = federated.test_client().get(
+        '/report?sample_id=sample1&sample_id=sample3&show_genes=yes')
+    assert page.status_code == 200
+    assert b'Sample 3' in page.data
+    assert b'GENE1' in page.data
+
+
+def test_reload_in_store(make_app, tmpdir):
+    uri = "sqlite:///{}".format(tmpdir.join('shard.sqlite'))
+    make_store(uri, ['sample2', 'sample3'])
+    app = make_app(samples=2, CHANJO_STORES={'shard': uri}, CHANJO_CACHE='memory')
+    client = app.test_client()
+    url = '/report?sample_id=sample1&sample_id=sample3'
+    response = client.get(url)
+    etag = response.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    store = connect(uri)
+    store.query(Sample).get('sample3').name = 'Reloaded 3'
+    store.query(Sample).get('sample3').created_at = datetime(2018, 1, 1)
+    store.session.commit()
+    store.session.remove()
+
+    reloaded = client.get(url, headers={'If-None-Match': etag})
+    assert reloaded.status_code == 200
+    assert reloaded.headers['ETag'] != etag
+    assert b'Reloaded 3' in reloaded.data
+
+
+def test_store_queries_timed(make_app, tmpdir):
+    uri = "sqlite:///{}".format(tmpdir.join('shard.sqlite'))
+    make_store(uri, ['sample2', 'sample3'])
+    federated = make_app(samples=2, CHANJO_STORES={'shard': uri})
+    single = make_app(samples=4)
+
+    def queries(app):
+        response = app.test_client().get('/report?sample_id=sample0&sample_id=sample2')
+        return int(re.search(r'desc="(\d+) queries"',
+                             response.headers['Server-Timing']).group(1))
+
+    # every query runs on the main database and the store
+    assert queries(federated) > queries(single)
+
+
+def test_summary_used_in_every_store(make_app, tmpdir, monkeypatch):
+    uri = "sqlite:///{}".format(tmpdir.join('shard.sqlite'))
+    refresh(make_store(uri, ['sample2', 'sample3']))
+    federated = make_app(samples=2, CHANJO_STORES={'shard': uri})
+    with federated.app_context():
+        refresh(api)
+        api.session.remove()
+    expected = export(make_app(samples=4), sample_ids=SAMPLE_IDS)
+
+    checks = []
+
+    def is_summarized(db_api, sample_ids):
+        summarized = real_is_summarized(db_api, sample_ids)
+        checks.append((sorted(sample_ids), summarized))
+        return summarized
+
+    real_is_summarized = utils.is_summarized
+    monkeypatch.setattr(utils, 'is_summarized', is_summarized)
+    assert export(federated, sample_ids=SAMPLE_IDS) == expected
+    assert checks
+    # each store only checks the samples it holds
+    assert all(sample_ids in (SAMPLE_IDS[:2], SAMPLE_IDS[2:]) and summarized
+               for sample_ids, summarized in checks)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""Cross-check reports read from the gene summary against the raw stats."""
+import pytest
+
+from chanjo_report.server.blueprints.report.utils import (
+    keymetrics_rows, transcript_counts)
+from chanjo_report.server.extensions import api
+from chanjo_report.server.summary import refresh
+
+from conftest import metrics_values
+
+SAMPLE_IDS = ['sample0', 'sample1', 'sample2', 'sample3']
+
+
+def compare_summary(app, func):
+    results = []
+    for summarize in (False, True):
+        with app.test_request_context():
+            if summarize:
+                refresh(api)
+            results.append(func())
+            api.session.remove()
+    return results
+
+
+@pytest.mark.parametrize('genes', [None, [1, 2, 5]])
+def test_keymetrics_rows(cohort, genes):
+    raw_rows, summary_rows = compare_summary(
+        cohort, lambda: metrics_values(keymetrics_rows(SAMPLE_IDS, genes=genes)))
+    assert len(summary_rows) == len(SAMPLE_IDS)
+    assert raw_rows == pytest.approx(summary_rows)
+
+
+def test_transcript_counts(cohort):
+    raw_counts, summary_counts = compare_summary(
+        cohort, lambda: {sample_id: tuple(row[1:]) for sample_id, row
+                         in transcript_counts(SAMPLE_IDS).items()})
+    assert raw_counts == summary_counts